@@ -0,0 +1,392 @@
+import argparse
+import contextlib
+import importlib.util
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import workloads
+
+# Benchmarks for the log, archive and corpus tools, run on the synthetic
+# inputs from workloads.py. Every case runs in fresh interpreters so peak RSS
+# belongs to that case alone; the timed repeats (at least --min-time in total,
+# split over --processes interpreters) run first, then one extra run under
+# tracemalloc for the peak of Python allocations. Results can be saved as a
+# baseline and later runs compared against it.
+#
+#   python bench.py --save baseline.json
+#   python bench.py --compare baseline.json
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+TASK4_DIR = os.path.join(REPO_DIR, 'solutions', 'task4')
+TASK7_DIR = os.path.join(REPO_DIR, 'solutions', 'task7')
+THROWER_FILE = os.path.join(REPO_DIR, 'attachments', 'task7', 'thrower.py')
+
+# Workload parameters per size
+SIZES = {
+    'small': {
+        'audit_lines': 2000, 'escape_density': 0.1,
+        'thrower': {'depth': 3, 'repeat': 4, 'width': 3},
+        'json_files': 200, 'json_text_size': 2000,
+        'eszip_modules': 100, 'eszip_module_lines': 100,
+    },
+    'medium': {
+        'audit_lines': 20000, 'escape_density': 0.1,
+        'thrower': {'depth': 4, 'repeat': 4, 'width': 3},
+        'json_files': 2000, 'json_text_size': 4000,
+        'eszip_modules': 1000, 'eszip_module_lines': 200,
+    },
+    'large': {
+        'audit_lines': 200000, 'escape_density': 0.1,
+        'thrower': {'depth': 5, 'repeat': 4, 'width': 3},
+        'json_files': 10000, 'json_text_size': 8000,
+        'eszip_modules': 5000, 'eszip_module_lines': 400,
+    },
+}
+
+class Skipped(Exception):
+    pass
+
+def load_module(name, path):
+    # Import a script by path (thrower.py is not on any package path)
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def import_tool(name):
+    # The tools import their siblings by plain name
+    for directory in (TASK4_DIR, TASK7_DIR):
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+    try:
+        if name == 'thrower':
+            # thrower.py exits when lark or dnspython is missing
+            with contextlib.redirect_stdout(open(os.devnull, 'w')):
+                return load_module('thrower', THROWER_FILE)
+        return __import__(name)
+    except (ImportError, SystemExit) as e:
+        raise Skipped(f"cannot import {name}: {e!r}")
+
+# Each case has a setup that generates its input under workdir (run once, in
+# the parent) and a runner that returns (function to time, cleanup between
+# repeats). The timed function returns the number of items it produced.
+
+def setup_transform(workdir, params, seed):
+    path = os.path.join(workdir, 'audit.log')
+    size = workloads.generate_audit_log(path, params['audit_lines'], params['escape_density'], seed)
+    return {'input': path, 'input_bytes': size}
+
+def runner_transform(workdir, workload):
+    transform = import_tool('transform')
+    output = os.path.join(workdir, 'commands.txt')
+
+    def run():
+        commands = transform.parse_file_content(workload['input'])
+        with open(output, 'w', encoding='utf-8') as f:
+            for cmd in commands:
+                f.write(cmd + '\n')
+        return len(commands)
+    return run, None
+
+def setup_thrower(workdir, params, seed):
+    path = os.path.join(workdir, 'program.txt')
+    size = workloads.generate_thrower_program(path, seed=seed, **params['thrower'])
+    return {'input': path, 'input_bytes': size}
+
+def runner_thrower_parse(workdir, workload):
+    thrower = import_tool('thrower')
+    with open(workload['input'], 'r') as f:
+        source = f.read()
+
+    def run():
+        tree = thrower.PARSER.parse(source)
+        return sum(1 for _ in tree.iter_subtrees())
+    return run, None
+
+def runner_thrower_run(workdir, workload):
+    thrower = import_tool('thrower')
+    with open(workload['input'], 'r') as f:
+        tree = thrower.PARSER.parse(f.read())
+
+    def run():
+        # Budget large enough for any generated program; nothing resolves
+        budget = thrower.ThrowerInterpreter.Budget(10 ** 12, time.time() + 10 ** 6)
+        interpreter = thrower.ThrowerInterpreter(budget, '127.0.0.1', 53)
+        interpreter.eval(tree)
+        return 10 ** 12 - interpreter.budget.remaining_compute
+    return run, None
+
+def setup_combine_json(workdir, params, seed):
+    directory = os.path.join(workdir, 'json')
+    size = workloads.generate_json_corpus(directory, params['json_files'], params['json_text_size'], seed)
+    return {'input': directory, 'input_bytes': size, 'items': params['json_files']}
+
+def runner_combine_json(workdir, workload):
+    combine_json = import_tool('combine_json')
+    output = os.path.join(workdir, 'combined.json')
+
+    def run():
+        combine_json.combine_json_files(workload['input'], output)
+        return workload['items']
+    return run, None
+
+def setup_recreate(workdir, params, seed):
+    path = os.path.join(workdir, 'eszip_archive.txt')
+    size = workloads.generate_eszip_dump(path, params['eszip_modules'], params['eszip_module_lines'], seed=seed)
+    return {'input': path, 'input_bytes': size, 'items': params['eszip_modules']}
+
+def runner_recreate(workdir, workload):
+    recreate = import_tool('recreate')
+    output = os.path.join(workdir, 'recreated')
+
+    def run():
+        recreate.create_files_from_log(workload['input'], output)
+        return workload['items']
+
+    def cleanup():
+        # Every repeat writes from scratch, not the skip-unchanged path, and
+        # starts without earlier runs' writes still pending writeback (which
+        # otherwise makes later runs, and later invocations, drift slower)
+        shutil.rmtree(output, ignore_errors=True)
+        os.sync()
+    return run, cleanup
+
+CASES = {
+    'transform': (setup_transform, runner_transform),
+    'thrower_parse': (setup_thrower, runner_thrower_parse),
+    'thrower_run': (setup_thrower, runner_thrower_run),
+    'combine_json': (setup_combine_json, runner_combine_json),
+    'recreate': (setup_recreate, runner_recreate),
+}
+
+def peak_rss_kb():
+    # ru_maxrss is KiB on Linux, bytes on macOS. Worker processes (combine_json
+    # parses on a process pool) count through RUSAGE_CHILDREN.
+    scale = 1024 if sys.platform == 'darwin' else 1
+    return max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+               resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss) // scale
+
+# Timed runs continue past --repeats until they add up to --min-time, so
+# millisecond cases get enough samples for a stable median and spread
+MIN_TIME = 1.0
+MAX_REPEATS = 1000
+# Fresh interpreters per case; MIN_TIME is shared between them
+PROCESSES = 3
+
+def relative_spread(times):
+    # Interquartile range over the median (full range for few samples): how
+    # much run-to-run noise a comparison has to allow for
+    if len(times) < 2:
+        return 0.0
+    median = statistics.median(times)
+    if len(times) >= 4:
+        low, _, high = statistics.quantiles(times, n=4)
+    else:
+        low, high = min(times), max(times)
+    return (high - low) / median if median else 0.0
+
+def run_case(name, workdir, workload, repeats, min_time=MIN_TIME):
+    # Runs inside a child interpreter; returns the raw timings and peaks
+    run, cleanup = CASES[name][1](workdir, workload)
+    times = []
+    with contextlib.redirect_stdout(open(os.devnull, 'w')):
+        while len(times) < repeats or (sum(times) < min_time and len(times) < MAX_REPEATS):
+            if cleanup:
+                cleanup()
+            start = time.perf_counter()
+            items = run()
+            times.append(time.perf_counter() - start)
+        rss = peak_rss_kb()
+
+        if cleanup:
+            cleanup()
+        tracemalloc.start()
+        run()
+        _, traced_peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    return {'times': times, 'items': items, 'peak_rss_kb': rss, 'traced_peak_bytes': traced_peak}
+
+def run_in_child(name, workdir, workload, repeats, min_time=MIN_TIME):
+    command = [sys.executable, os.path.abspath(__file__), '--run-case', name,
+               '--workdir', workdir, '--workload', json.dumps(workload), '--repeats', str(repeats),
+               '--min-time', str(min_time)]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        return {'error': result.stderr.strip().splitlines()[-1] if result.stderr.strip() else f'exit {result.returncode}'}
+    return json.loads(result.stdout)
+
+def measure_case(name, workdir, workload, repeats=3, min_time=MIN_TIME, processes=PROCESSES):
+    # Run the case in several fresh interpreters and pool their timings. The
+    # spread covers both the noise within a process and the drift between
+    # processes, which on a shared machine is often the larger of the two.
+    samples = []
+    for _ in range(processes):
+        sample = run_in_child(name, workdir, workload, repeats, min_time / processes)
+        if 'times' not in sample:
+            return sample  # skipped or error
+        samples.append(sample)
+
+    times = [t for sample in samples for t in sample['times']]
+    medians = [statistics.median(sample['times']) for sample in samples]
+    seconds = statistics.median(times)
+    items = samples[0]['items']
+    return {
+        'seconds': seconds,
+        'best_seconds': min(times),
+        'runs': len(times),
+        'processes': processes,
+        'spread': max(relative_spread(times), (max(medians) - min(medians)) / seconds if seconds else 0.0),
+        'items': items,
+        'items_per_second': items / seconds if seconds else None,
+        'mb_per_second': workload['input_bytes'] / seconds / 1e6 if seconds else None,
+        'input_bytes': workload['input_bytes'],
+        'peak_rss_kb': max(sample['peak_rss_kb'] for sample in samples),
+        'traced_peak_bytes': max(sample['traced_peak_bytes'] for sample in samples),
+    }
+
+def run_benchmarks(cases, size='small', seed=0, repeats=3, workdir=None, min_time=MIN_TIME, processes=PROCESSES):
+    params = SIZES[size]
+    results = {}
+    with tempfile.TemporaryDirectory(prefix='bench-', dir=workdir) as base:
+        workloads_by_setup = {}
+        for name in cases:
+            setup = CASES[name][0]
+            case_dir = os.path.join(base, setup.__name__[len('setup_'):])
+            if setup not in workloads_by_setup:
+                os.makedirs(case_dir, exist_ok=True)
+                print(f"Generating {size} workload for {name}...")
+                workloads_by_setup[setup] = setup(case_dir, params, seed)
+            print(f"Running {name}...")
+            results[name] = measure_case(name, case_dir, workloads_by_setup[setup], repeats, min_time, processes)
+            print(f"  {format_result(results[name])}")
+    return {
+        'size': size,
+        'seed': seed,
+        'repeats': repeats,
+        'min_time': min_time,
+        'processes': processes,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'results': results,
+    }
+
+def format_result(result):
+    if 'skipped' in result:
+        return f"skipped: {result['skipped']}"
+    if 'error' in result:
+        return f"error: {result['error']}"
+    return (f"{result['seconds']:.3f}s (median of {result['runs']} in {result['processes']} processes, "
+            f"spread {result['spread']:.1%}), "
+            f"{result['items_per_second']:.0f} items/s, "
+            f"{result['mb_per_second']:.2f} MB/s, peak RSS {result['peak_rss_kb'] / 1024:.1f} MiB, "
+            f"traced peak {result['traced_peak_bytes'] / 2 ** 20:.1f} MiB")
+
+# Compared metrics: (key, True if run-to-run timing noise applies). Times
+# are medians; memory peaks are close to deterministic.
+COMPARED = (('seconds', True), ('peak_rss_kb', False), ('traced_peak_bytes', False))
+# A timing change only counts once it exceeds this many times the larger
+# measured spread of the two runs (and the threshold)
+NOISE_FACTOR = 2.0
+# ...but the noise allowance never grows past this many times the threshold.
+# Changes above the threshold that noise could still explain are reported as
+# inconclusive rather than passed.
+MAX_NOISE_MULTIPLE = 3.0
+
+def compare(baseline, current, threshold=0.10):
+    # Print the change of every metric against the baseline; return the
+    # names of cases that regressed beyond what threshold and noise allow,
+    # and of cases too noisy to tell
+    if (baseline.get('size'), baseline.get('seed')) != (current['size'], current['seed']):
+        print(f"Warning: baseline is for size={baseline.get('size')} seed={baseline.get('seed')}, "
+              f"this run is size={current['size']} seed={current['seed']}")
+    regressions = []
+    inconclusive = []
+    for name, result in current['results'].items():
+        before = baseline.get('results', {}).get(name)
+        if not before or 'seconds' not in before or 'seconds' not in result:
+            print(f"{name}: no comparable baseline")
+            continue
+        changes = []
+        regressed = unsure = False
+        for key, noisy in COMPARED:
+            if not before[key]:
+                continue
+            change = (result[key] - before[key]) / before[key]
+            allowed = threshold
+            if noisy:
+                noise = NOISE_FACTOR * max(before.get('spread', 0.0), result['spread'])
+                allowed = min(max(threshold, noise), MAX_NOISE_MULTIPLE * threshold)
+            marker = ''
+            if change > allowed:
+                marker = ' REGRESSION'
+                regressed = True
+            elif change > threshold:
+                marker = ' INCONCLUSIVE'
+                unsure = True
+            changes.append(f"{key} {change:+.1%} (allowed {allowed:.0%}){marker}")
+        print(f"{name}: " + ', '.join(changes))
+        if regressed:
+            regressions.append(name)
+        elif unsure:
+            inconclusive.append(name)
+    return regressions, inconclusive
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Benchmark the solution tools on synthetic workloads.")
+    parser.add_argument("cases", nargs='*', help=f"Cases to run (default: all of {', '.join(CASES)}).")
+    parser.add_argument("--size", choices=SIZES, default='small', help="Workload size (default: small).")
+    parser.add_argument("--seed", type=int, default=0, help="Workload generator seed (default: 0).")
+    parser.add_argument("--repeats", type=int, default=3, help="Minimum timed runs per case; the median is reported (default: 3).")
+    parser.add_argument("--min-time", type=float, default=MIN_TIME, help=f"Keep repeating a case until its runs add up to this many seconds (default: {MIN_TIME:g}).")
+    parser.add_argument("--processes", type=int, default=PROCESSES, help=f"Fresh interpreters per case, timings pooled (default: {PROCESSES}).")
+    parser.add_argument("--workdir", default=None, help="Where to generate workloads (default: system temp dir).")
+    parser.add_argument("--save", default=None, help="Write the results to this baseline file.")
+    parser.add_argument("--compare", default=None, help="Compare the results against this baseline file.")
+    parser.add_argument("--threshold", type=float, default=0.10, help=f"Smallest relative slowdown/growth counted as a regression; timings also allow for their measured spread, up to {MAX_NOISE_MULTIPLE:g}x this (default: 0.10).")
+    parser.add_argument("--run-case", default=None, help=argparse.SUPPRESS)
+    parser.add_argument("--workload", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.run_case:
+        # Child mode: one case in a fresh interpreter, result as JSON on stdout
+        try:
+            result = run_case(args.run_case, args.workdir, json.loads(args.workload), args.repeats, args.min_time)
+        except Skipped as e:
+            result = {'skipped': str(e)}
+        print(json.dumps(result))
+        sys.exit(0)
+
+    unknown = [name for name in args.cases if name not in CASES]
+    if unknown:
+        parser.error(f"unknown case(s): {', '.join(unknown)}")
+
+    current = run_benchmarks(args.cases or list(CASES), args.size, args.seed, args.repeats, args.workdir, args.min_time, args.processes)
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=4)
+        print(f"Results saved to '{args.save}'.")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        regressions, inconclusive = compare(baseline, current, args.threshold)
+        if inconclusive:
+            print(f"Inconclusive (slower, but within measured noise): {', '.join(inconclusive)}; "
+                  f"rerun with a larger --min-time or --processes")
+        if regressions:
+            print(f"Regressions: {', '.join(regressions)}")
+            sys.exit(1)
+        if inconclusive:
+            sys.exit(2)
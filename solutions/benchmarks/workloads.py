@@ -0,0 +1,114 @@
+import json
+import os
+import random
+
+# Deterministic synthetic inputs for the benchmarks in bench.py. Every
+# generator takes a seed, so the same parameters always produce byte-identical
+# files and runs can be compared against saved baselines.
+
+_WORDS = (
+    'docker run curl git clone make install python pip export source ls cat grep sed awk '
+    'ssh scp tar gzip chmod chown echo vim nano mongo deno node npm cargo build test profile '
+    'function library serialization performance memory thread async request response'
+).split()
+
+# Escape sequences as they appear (already escaped) in ttyaudit d= fields
+_EDITS = ('\\x08', '\\033[D', '\\033[C', '\\x01', '\\x05', '\\033[3~', '\\033[A', '\\033[B')
+
+def _words(rng, count):
+    return ' '.join(rng.choice(_WORDS) for _ in range(count))
+
+def generate_audit_log(path, lines=10000, escape_density=0.1, seed=0):
+    # ttyaudit records like attachments/task4/audit.log. escape_density is the
+    # chance that any typed character is followed by an editing escape.
+    rng = random.Random(seed)
+    timestamp = 1716292854
+    with open(path, 'w', encoding='utf-8') as f:
+        for record_id in range(lines):
+            typed = []
+            for c in _words(rng, rng.randint(2, 12)):
+                typed.append(c)
+                if rng.random() < escape_density:
+                    typed.append(rng.choice(_EDITS))
+            data = ''.join(typed) + ('\\x03' if rng.random() < 0.02 else '\\x0d')
+            timestamp += rng.randint(1, 120)
+            f.write(f"ttyaudit={timestamp} w=4 d={data} u=1000 s={len(data)} "
+                    f"id={360782 + record_id} c={rng.getrandbits(16):#06x}\n")
+    return os.path.getsize(path)
+
+def generate_thrower_program(path, depth=3, repeat=4, width=3, seed=0):
+    # A thrower program of nested repeat/if blocks over registers. It never
+    # resolves, so running it measures the parser and interpreter only.
+    # Evaluations grow roughly as (width * repeat) ** depth.
+    rng = random.Random(seed)
+
+    def block(level, indent):
+        pad = '    ' * indent
+        out = []
+        for _ in range(width):
+            out.append(f'{pad}load r{rng.randint(0, 3)}')
+            out.append(f'{pad}store r{rng.randint(0, 3)}')
+            out.append(f'{pad}assert r{rng.randint(0, 3)} != "{rng.choice(_WORDS)}"')
+            if level < depth:
+                register = rng.randint(0, 3)
+                out.append(rng.choice((
+                    f'{pad}repeat {repeat} {{',
+                    f'{pad}if r{register} == 0 {{',
+                    f'{pad}if r{register} != "{rng.choice(_WORDS)}" {{',
+                )))
+                out += block(level + 1, indent + 1)
+                out.append(f'{pad}}}')
+        return out
+
+    # 'sleep 0' is the only instruction that yields a value without a
+    # register, so it seeds every register with 0
+    lines = ['# generated by benchmarks/workloads.py', 'sleep 0']
+    lines += [f'store r{register}' for register in range(4)]
+    lines += block(1, 0)
+    with open(path, 'w') as f:
+        f.write('\n'.join(lines) + '\n')
+    return os.path.getsize(path)
+
+def generate_json_corpus(directory, files=1000, text_size=2000, seed=0):
+    # Scraped {q, body} records like the ones combine_json.py merges
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    total = 0
+    for index in range(files):
+        query = _words(rng, rng.randint(6, 20))
+        text = _words(rng, max(1, text_size // 6))
+        record = {
+            'q': query,
+            'body': {
+                'fulfillment': [{'index': 0, 'role': 'assistant', 'text': text}],
+                'id': f'{rng.getrandbits(128):032x}',
+                'lang': rng.choice(('en', 'en', 'en', 'de', 'fr')),
+                'model': rng.choice(('gagpt-xl', 'gagpt-l', 'gagpt-m')),
+                'prompt': query,
+                'upstream': f'gagpt-xl-{rng.randint(1, 9)}.internal',
+            },
+        }
+        path = os.path.join(directory, f'{index:06d}.json')
+        with open(path, 'w') as f:
+            json.dump(record, f, indent=4)
+        total += os.path.getsize(path)
+    return total
+
+def generate_eszip_dump(path, modules=200, module_lines=100, separator_lines=0.0, seed=0):
+    # Text dump in the format recreate.py parses (see deno_localized/eszip_archive.txt).
+    # separator_lines is the chance that a source line is a bare '---'.
+    rng = random.Random(seed)
+    with open(path, 'w', encoding='utf-8') as f:
+        for index in range(modules):
+            host = rng.choice(('https://deno.land/std@0.224.0', 'https://jsr.io/@std/assert/1.0.0', 'file:///work/src'))
+            f.write(f'Specifier: {host}/{rng.choice(_WORDS)}/mod_{index}.ts\n')
+            f.write('Kind: JavaScript\n---\n')
+            for _ in range(module_lines):
+                if rng.random() < separator_lines:
+                    f.write('---\n')
+                else:
+                    f.write(f'export const {rng.choice(_WORDS)}_{rng.randint(0, 999)} = "{_words(rng, 6)}";\n')
+            f.write('\n---\n')
+            f.write('{"version":3,"sources":[],"mappings":"AAAA"}\n')
+            f.write('============\n')
+    return os.path.getsize(path)
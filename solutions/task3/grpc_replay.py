@@ -0,0 +1,96 @@
+import argparse
+import threading
+import time
+
+import grpc
+
+from load_stats import LoadStats, report
+from rpc_capture import iter_in_offset_order, read_capture
+
+# Replay a capture recorded by python_grpc_server.py --capture. Requests are
+# sent as the raw serialized bytes they arrived as, so no generated stubs are
+# needed. Timing starts at the first captured call: --speed 1 keeps the
+# recorded timing, N compresses it N times and 0 sends as fast as the
+# in-flight limit allows.
+
+# Headers the channel sets itself and must not be replayed
+_TRANSPORT_HEADERS = {'user-agent', 'content-type', 'te', 'grpc-accept-encoding', 'grpc-encoding', 'grpc-timeout'}
+
+def _replayable_metadata(metadata):
+    return tuple(
+        (key, value) for key, value in metadata
+        if not key.startswith(':') and key not in _TRANSPORT_HEADERS
+    )
+
+def replay(host, capture_file, speed=1.0, parallel=64, channels=4, timeout=5.0, loops=1):
+    channel_pool = [grpc.insecure_channel(host) for _ in range(channels)]
+    callables = {}
+    in_flight = threading.Semaphore(parallel)
+    done = threading.Condition()
+    outstanding = 0
+    stats = LoadStats(0.0)
+
+    def on_done(future, started):
+        nonlocal outstanding
+        stats.record(started, time.perf_counter(), future.code())
+        in_flight.release()
+        with done:
+            outstanding -= 1
+            done.notify_all()
+
+    def method_callable(method, index):
+        key = (method, index % channels)
+        if key not in callables:
+            # Identity (de)serializers: requests go out as captured
+            callables[key] = channel_pool[key[1]].unary_unary(method)
+        return callables[key]
+
+    sent = 0
+    start = time.perf_counter()
+    for loop in range(loops):
+        loop_start = time.perf_counter()
+        first_offset = None
+        for call in iter_in_offset_order(read_capture(capture_file)):
+            # Offsets count from when capturing started, not from the first
+            # call, so the idle time before it is skipped
+            if first_offset is None:
+                first_offset = call.offset
+            scheduled = loop_start + (call.offset - first_offset) / speed if speed > 0 else None
+            if scheduled is not None:
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            # At max speed this is where parallelism limits the send rate
+            in_flight.acquire()
+            started = scheduled if scheduled is not None else time.perf_counter()
+            with done:
+                outstanding += 1
+            future = method_callable(call.method, sent).future(
+                call.request, timeout=timeout, metadata=_replayable_metadata(call.metadata))
+            future.add_done_callback(lambda f, started=started: on_done(f, started))
+            sent += 1
+
+    with done:
+        done.wait_for(lambda: outstanding == 0)
+    elapsed = time.perf_counter() - start
+
+    print(f"Replayed {sent} calls from '{capture_file}' to {host} at "
+          f"{'max speed' if speed <= 0 else f'{speed:g}x'} with up to {parallel} in flight")
+    report(stats, elapsed)
+
+    for channel in channel_pool:
+        channel.close()
+    return stats
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay a gRPC capture against a server.")
+    parser.add_argument("capture_file", help="Capture written by python_grpc_server.py --capture.")
+    parser.add_argument("--host", default="localhost:50052", help="The server host (default: localhost:50052).")
+    parser.add_argument("--speed", type=float, default=1.0, help="Timing multiplier: 1 as recorded, N for N times faster, 0 for max speed (default: 1).")
+    parser.add_argument("--parallel", type=int, default=64, help="Maximum calls in flight (default: 64).")
+    parser.add_argument("--channels", type=int, default=4, help="Number of channels in the pool (default: 4).")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Per-call deadline in seconds (default: 5).")
+    parser.add_argument("--loops", type=int, default=1, help="Replay the capture this many times (default: 1).")
+    args = parser.parse_args()
+
+    replay(args.host, args.capture_file, args.speed, args.parallel, args.channels, args.timeout, args.loops)
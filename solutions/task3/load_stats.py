@@ -0,0 +1,50 @@
+import math
+import threading
+from array import array
+
+import grpc
+
+# Latency and error accounting shared by the load generator
+# (python_grpc_client.py --load) and grpc_replay.py. Kept free of generated
+# stub imports so either tool runs with only the stubs it actually needs.
+
+class LoadStats:
+    def __init__(self, measure_from):
+        self.measure_from = measure_from
+        self.latencies = array('d')
+        self.errors = {}
+        self.skipped = 0
+        self.first = None
+        self.last = None
+        self._lock = threading.Lock()
+
+    def record(self, started, finished, code):
+        if finished < self.measure_from:
+            return  # Warm-up
+        with self._lock:
+            if self.first is None:
+                self.first = finished
+            self.last = finished
+            if code == grpc.StatusCode.OK:
+                self.latencies.append(finished - started)
+            else:
+                self.errors[code.name] = self.errors.get(code.name, 0) + 1
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    # Nearest rank: the smallest value with at least fraction of the samples
+    # at or below it
+    rank = math.ceil(fraction * len(sorted_values))
+    return sorted_values[min(max(rank, 1), len(sorted_values)) - 1]
+
+def report(stats, elapsed):
+    latencies = sorted(stats.latencies)
+    completed = len(latencies) + sum(stats.errors.values())
+    print(f"Completed: {completed} calls in {elapsed:.2f}s ({completed / elapsed if elapsed else 0:.1f} calls/s)")
+    print(f"OK: {len(latencies)}, errors: {stats.errors or 0}, skipped (too many in flight): {stats.skipped}")
+    if latencies:
+        print("Latency (ms): " + ", ".join(
+            f"{name}={percentile(latencies, fraction) * 1000:.2f}"
+            for name, fraction in (("p50", 0.50), ("p90", 0.90), ("p99", 0.99))
+        ) + f", max={latencies[-1] * 1000:.2f}")
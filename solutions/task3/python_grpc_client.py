@@ -1,9 +1,17 @@
 import argparse
+import itertools
+import json
+import os
+import struct
+import threading
+import time
+from collections import deque
 
 import grpc
 
 import seed_generation_pb2
 import seed_generation_pb2_grpc
+from load_stats import LoadStats, report
 
 def run(host):
     channel = grpc.insecure_channel(host)
@@ -12,10 +20,265 @@ def run(host):
     response = stub.GetSeed(seed_generation_pb2.GetSeedRequest(username="jasper_05376",password="test"))
     print("SeedGenerationService client received: Seed=" + str(response.seed) + ", Count=" + str(response.count))
 
+# Load generation: a pool of channels shared round-robin between callers,
+# either N closed-loop callers (--concurrency) or an open-loop schedule at a
+# fixed request rate (--rate). Calls finishing during the warm-up are not
+# counted. In rate mode latency is measured from the scheduled send time, so
+# a slow server can't hide its queueing delay.
+
+def make_calls(target, channels, username, password):
+    # Return one unary callable per channel for the chosen target service
+    if target == "seed":
+        request = seed_generation_pb2.GetSeedRequest(username=username, password=password)
+        return [seed_generation_pb2_grpc.SeedGenerationServiceStub(channel).GetSeed for channel in channels], request
+
+    import auth_pb2
+    import auth_pb2_grpc
+    request = auth_pb2.PingRequest()
+    return [auth_pb2_grpc.AuthServiceStub(channel).Ping for channel in channels], request
+
+def run_closed_loop(calls, request, stats, concurrency, deadline, timeout):
+    next_call = itertools.cycle(calls)
+    lock = threading.Lock()
+
+    def caller():
+        while True:
+            with lock:
+                call = next(next_call)
+            started = time.perf_counter()
+            if started >= deadline:
+                return
+            try:
+                call(request, timeout=timeout)
+                code = grpc.StatusCode.OK
+            except grpc.RpcError as e:
+                code = e.code()
+            stats.record(started, time.perf_counter(), code)
+
+    threads = [threading.Thread(target=caller, daemon=True) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+def run_open_loop(calls, request, stats, rate, deadline, timeout, max_in_flight):
+    in_flight = threading.Semaphore(max_in_flight)
+    done = threading.Condition()
+    outstanding = 0
+
+    def on_done(future, scheduled):
+        nonlocal outstanding
+        code = future.code()
+        stats.record(scheduled, time.perf_counter(), code)
+        in_flight.release()
+        with done:
+            outstanding -= 1
+            done.notify_all()
+
+    interval = 1.0 / rate
+    start = time.perf_counter()
+    for i, call in enumerate(itertools.cycle(calls)):
+        scheduled = start + i * interval
+        if scheduled >= deadline:
+            break
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        if not in_flight.acquire(blocking=False):
+            stats.skipped += 1
+            continue
+        with done:
+            outstanding += 1
+        future = call.future(request, timeout=timeout)
+        future.add_done_callback(lambda f, scheduled=scheduled: on_done(f, scheduled))
+
+    with done:
+        done.wait_for(lambda: outstanding == 0)
+
+def run_load(host, target="seed", concurrency=10, rate=None, duration=10.0, warmup=2.0,
+             channels=4, username="jasper_05376", password="test", timeout=5.0, max_in_flight=10000):
+    channel_pool = [grpc.insecure_channel(host) for _ in range(channels)]
+    calls, request = make_calls(target, channel_pool, username, password)
+
+    start = time.perf_counter()
+    stats = LoadStats(start + warmup)
+    deadline = start + warmup + duration
+    if rate:
+        print(f"Sending {rate} calls/s to {target} on {host} for {duration}s (+{warmup}s warm-up) over {channels} channels")
+        run_open_loop(calls, request, stats, rate, deadline, timeout, max_in_flight)
+    else:
+        print(f"Running {concurrency} callers against {target} on {host} for {duration}s (+{warmup}s warm-up) over {channels} channels")
+        run_closed_loop(calls, request, stats, concurrency, deadline, timeout)
+
+    elapsed = (stats.last - stats.first) if stats.first is not None and stats.last > stats.first else duration
+    report(stats, elapsed)
+
+    for channel in channel_pool:
+        channel.close()
+    return stats
+
+# Seed harvesting: GetSeed is pipelined over a pool of channels for every
+# credential (optionally several times each) and the results are appended to
+# a compact binary file:
+#
+#   header   b'SEEDHV01'
+#   record   u16 username length | username | i64 seed | i64 count | f64 timestamp
+#
+# Records with an already seen (username, seed, count) are skipped. A sidecar
+# <output>.resume holds how many jobs have been attempted and which of those
+# failed, so an interrupted harvest picks up where it stopped and retries the
+# failed calls first.
+HARVEST_MAGIC = b'SEEDHV01'
+_HARVEST_FIELDS = struct.Struct('>qqd')
+
+def read_credentials(path, default_password):
+    # One 'username' or 'username:password' per line
+    credentials = []
+    with open(path, 'r') as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith('#'):
+                continue
+            username, sep, password = line.partition(':')
+            credentials.append((username, password if sep else default_password))
+    return credentials
+
+def read_harvest(path):
+    # Yield (username, seed, count, timestamp); a torn last record is ignored
+    with open(path, 'rb') as f:
+        if f.read(len(HARVEST_MAGIC)) != HARVEST_MAGIC:
+            raise ValueError(f"{path}: not a seed harvest file")
+        while True:
+            prefix = f.read(2)
+            if len(prefix) < 2:
+                return
+            name = f.read(struct.unpack('>H', prefix)[0])
+            fields = f.read(_HARVEST_FIELDS.size)
+            if len(fields) < _HARVEST_FIELDS.size:
+                return
+            yield (name.decode('utf-8'),) + _HARVEST_FIELDS.unpack(fields)
+
+def _open_harvest(path):
+    # Open for appending, trimming a torn last record; returns (file, seen keys)
+    seen = set()
+    if not os.path.exists(path) or os.path.getsize(path) == 0:
+        out = open(path, 'wb')
+        out.write(HARVEST_MAGIC)
+        return out, seen
+
+    valid_end = len(HARVEST_MAGIC)
+    for username, seed, count, _ in read_harvest(path):
+        seen.add((username, seed, count))
+        valid_end += 2 + len(username.encode('utf-8')) + _HARVEST_FIELDS.size
+    out = open(path, 'r+b')
+    out.truncate(valid_end)
+    out.seek(valid_end)
+    return out, seen
+
+def _load_resume(path, total):
+    # Return (jobs attempted, failed jobs to retry)
+    if not os.path.exists(path):
+        return 0, []
+    with open(path, 'r') as f:
+        state = json.load(f)
+    done = min(state['done'], total)
+    return done, sorted(job for job in set(state.get('failed', [])) if job < done)
+
+def _save_resume(path, done, failed):
+    with open(path + '.tmp', 'w') as f:
+        json.dump({'done': done, 'failed': sorted(failed)}, f)
+    os.replace(path + '.tmp', path)
+
+def harvest(host, credentials, output_file, repeat=1, channels=4, window=256, timeout=5.0, checkpoint_every=1000):
+    resume_file = output_file + '.resume'
+    total = len(credentials) * repeat
+    done, retry = _load_resume(resume_file, total)
+    # Failed jobs are not done: they stay listed until a call succeeds
+    failed = set(retry)
+
+    out, seen = _open_harvest(output_file)
+    channel_pool = [grpc.insecure_channel(host) for _ in range(channels)]
+    stubs = [seed_generation_pb2_grpc.SeedGenerationServiceStub(channel) for channel in channel_pool]
+    written = duplicates = finished = 0
+    errors = {}
+    pending = deque()
+    start = time.perf_counter()
+    print(f"Harvesting {len(retry) + total - done} of {total} GetSeed calls from {host} into '{output_file}'"
+          + (f" ({len(retry)} retried)" if retry else ""))
+
+    def finish():
+        # Complete the oldest call; keeping completion in order makes the
+        # resume point a simple count
+        nonlocal done, written, duplicates, finished
+        job, username, future = pending.popleft()
+        try:
+            response = future.result()
+        except grpc.RpcError as e:
+            errors[e.code().name] = errors.get(e.code().name, 0) + 1
+            failed.add(job)
+        else:
+            failed.discard(job)
+            key = (username, response.seed, response.count)
+            if key in seen:
+                duplicates += 1
+            else:
+                seen.add(key)
+                name = username.encode('utf-8')
+                out.write(struct.pack('>H', len(name)) + name + _HARVEST_FIELDS.pack(response.seed, response.count, time.time()))
+                written += 1
+        done = max(done, job + 1)
+        finished += 1
+        if finished % checkpoint_every == 0:
+            out.flush()
+            _save_resume(resume_file, done, failed)
+
+    try:
+        # Retries come first; done only moves once they are behind it
+        for job in itertools.chain(retry, range(done, total)):
+            username, password = credentials[job // repeat]
+            request = seed_generation_pb2.GetSeedRequest(username=username, password=password)
+            pending.append((job, username, stubs[job % channels].GetSeed.future(request, timeout=timeout)))
+            if len(pending) >= window:
+                finish()
+        while pending:
+            finish()
+    finally:
+        # Everything finished so far is on disk before the resume point moves
+        out.close()
+        _save_resume(resume_file, done, failed)
+        for channel in channel_pool:
+            channel.close()
+
+    elapsed = time.perf_counter() - start
+    print(f"Done {done - len(failed)}/{total} in {elapsed:.2f}s: {written} records written, {duplicates} duplicates, "
+          f"errors: {errors or 0}" + (f", {len(failed)} failed calls left for the next run" if failed else ""))
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(
         description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
     )
     parser.add_argument("--host", default="localhost:50051", help="The server host.")
+    parser.add_argument("--load", action="store_true", help="Run a load test instead of a single call.")
+    parser.add_argument("--target", choices=("seed", "auth-ping"), default="seed", help="SeedGenerationService.GetSeed or the AuthService mock's Ping (default: seed).")
+    parser.add_argument("--concurrency", type=int, default=10, help="Closed-loop callers (default: 10).")
+    parser.add_argument("--rate", type=float, default=None, help="Open-loop target rate in calls/s; overrides --concurrency.")
+    parser.add_argument("--duration", type=float, default=10.0, help="Measured duration in seconds (default: 10).")
+    parser.add_argument("--warmup", type=float, default=2.0, help="Warm-up excluded from the results, in seconds (default: 2).")
+    parser.add_argument("--channels", type=int, default=4, help="Number of channels in the pool (default: 4).")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Per-call deadline in seconds (default: 5).")
+    parser.add_argument("--username", default="jasper_05376", help="GetSeed username.")
+    parser.add_argument("--password", default="test", help="GetSeed password.")
+    parser.add_argument("--harvest", metavar="CREDENTIALS", help="Harvest seeds for every 'username[:password]' line in this file.")
+    parser.add_argument("--output", default="seeds.bin", help="Harvest output file (default: seeds.bin).")
+    parser.add_argument("--repeat", type=int, default=1, help="GetSeed calls per credential when harvesting (default: 1).")
+    parser.add_argument("--window", type=int, default=256, help="Calls in flight when harvesting (default: 256).")
     args = parser.parse_args()
-    run(args.host)
\ No newline at end of file
+
+    if args.harvest:
+        harvest(args.host, read_credentials(args.harvest, args.password), args.output,
+                args.repeat, args.channels, args.window, args.timeout)
+    elif args.load:
+        run_load(args.host, args.target, args.concurrency, args.rate, args.duration, args.warmup,
+                 args.channels, args.username, args.password, args.timeout)
+    else:
+        run(args.host)
@@ -1,92 +1,76 @@
 from concurrent import futures
+import argparse
+import asyncio
 import time
 import grpc
 import logging
 
 import auth_pb2
 import auth_pb2_grpc
+from rpc_capture import RpcCaptureWriter
+from rpc_logging import DEFAULT_QUEUE_SIZE, RpcLogWriter, parse_sample_rates
+from rpc_metrics import RpcMetrics, serve_metrics
+from rpc_observers import AsyncObservingInterceptor, ObservingInterceptor
 
 _ONE_DAY_IN_SECONDS = 60 * 60 * 24
 
+DEFAULT_ADDRESS = "[::]:50052"
+DEFAULT_MAX_WORKERS = 10
+
 # Configure logging
 logging.basicConfig(
-    level=logging.DEBUG,
+    level=logging.INFO,
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
 
-# Interceptor for handling logging on method not found or decoding errors
-class LoggingInterceptor(grpc.ServerInterceptor):
-    def intercept_service(self, continuation, handler_call_details):
-        method = handler_call_details.method
-        logging.info(f"Incoming request for method: {method}")
-        
-        try:
-            # Call the actual service method
-            response = continuation(handler_call_details)
-            return response
-        except grpc.RpcError as e:
-            # Log error details
-            if e.code() == grpc.StatusCode.UNIMPLEMENTED:
-                logging.error(f"Method not found: {method}")
-            elif e.code() == grpc.StatusCode.INVALID_ARGUMENT:
-                logging.error(f"Request decoding error for method: {method}")
-            else:
-                logging.error(f"Error during request handling: {e}")
-            raise e
-
+# RPCs are logged by an observer on the interceptor (see rpc_logging.py): one
+# structured record per call, formatted and written off the request path
 class AuthService(auth_pb2_grpc.AuthServiceServicer):
-    def log_metadata(self, context):
-        # Log the incoming metadata (headers)
-        metadata = context.invocation_metadata()
-        logging.info("Received headers:")
-        for key, value in metadata:
-            logging.info(f"{key}: {value}")
-
     def Ping(self, request, context):
-        # Log headers and request details
-        self.log_metadata(context)
-        logging.debug(f"Received Ping request: {request}")
-        
         # Return the Ping response
         return auth_pb2.PingResponse(response=1)
 
     def Authenticate(self, request, context):
-        # Log headers and request details
-        self.log_metadata(context)
-        logging.debug(f"Received Authenticate request: {request}")
-        
         # Return the Authenticate response
         return auth_pb2.AuthResponse(success=True)
 
     def RegisterOTPSeed(self, request, context):
-        # Log headers and request details
-        self.log_metadata(context)
-        logging.debug(f"Received RegisterOTPSeed request: {request}")
-        
         # Return the RegisterOTPSeed response
         return auth_pb2.RegisterOTPSeedResponse(success=False)
 
     def VerifyOTP(self, request, context):
-        # Log headers and request details
-        self.log_metadata(context)
-        logging.debug(f"Received VerifyOTP request: {request}")
-        
         # Return the RegisterOTPSeed response
         return auth_pb2.VerifyOTPResponse(success=True,token="000000")
 
-def serve():
+# The handlers never block, so the asyncio service simply runs the same code
+# on the event loop instead of a worker thread
+class AsyncAuthService(AuthService):
+    async def Ping(self, request, context):
+        return super().Ping(request, context)
+
+    async def Authenticate(self, request, context):
+        return super().Authenticate(request, context)
+
+    async def RegisterOTPSeed(self, request, context):
+        return super().RegisterOTPSeed(request, context)
+
+    async def VerifyOTP(self, request, context):
+        return super().VerifyOTP(request, context)
+
+def serve(address=DEFAULT_ADDRESS, max_workers=DEFAULT_MAX_WORKERS, max_concurrent_rpcs=None, observers=()):
     # Add the interceptor to the server
     server = grpc.server(
-        futures.ThreadPoolExecutor(max_workers=10),
-        interceptors=[LoggingInterceptor()]
+        futures.ThreadPoolExecutor(max_workers=max_workers),
+        interceptors=[ObservingInterceptor(observers)],
+        maximum_concurrent_rpcs=max_concurrent_rpcs
     )
     
     auth_pb2_grpc.add_AuthServiceServicer_to_server(AuthService(), server)
-    server.add_insecure_port("[::]:50052")
+    server.add_insecure_port(address)
     server.start()
 
     # Log the server start event
-    logging.info("gRPC server started on port 50052")
+    logging.info(f"gRPC server started on {address} (threaded, {max_workers} workers)")
 
     try:
         while True:
@@ -97,5 +81,79 @@ def serve():
         server.stop(grace=0)
         logging.info("gRPC server stopped")
 
+async def serve_aio(address=DEFAULT_ADDRESS, max_concurrent_rpcs=None, observers=()):
+    server = grpc.aio.server(
+        interceptors=[AsyncObservingInterceptor(observers)],
+        maximum_concurrent_rpcs=max_concurrent_rpcs
+    )
+
+    auth_pb2_grpc.add_AuthServiceServicer_to_server(AsyncAuthService(), server)
+    server.add_insecure_port(address)
+    await server.start()
+
+    # Log the server start event
+    logging.info(f"gRPC server started on {address} (asyncio)")
+
+    try:
+        await server.wait_for_termination()
+    finally:
+        # Log the server stop event
+        logging.info("Stopping gRPC server...")
+        await server.stop(grace=0)
+        logging.info("gRPC server stopped")
+
 if __name__ == "__main__":
-    serve()
+    parser = argparse.ArgumentParser(description="Mock AuthService gRPC server.")
+    parser.add_argument("--mode", choices=("thread", "aio"), default="thread", help="Serve from a thread pool or from grpc.aio (default: thread).")
+    parser.add_argument("--address", default=DEFAULT_ADDRESS, help=f"Address to bind (default: {DEFAULT_ADDRESS}).")
+    parser.add_argument("--max-workers", type=int, default=DEFAULT_MAX_WORKERS, help=f"Thread pool size in thread mode (default: {DEFAULT_MAX_WORKERS}).")
+    parser.add_argument("--max-concurrent-rpcs", type=int, default=None, help="Reject RPCs beyond this many in flight (default: unlimited).")
+    parser.add_argument("--log-file", default=None, help="Write the per-RPC records here instead of stderr.")
+    parser.add_argument("--log-sample", type=float, default=1.0, help="Fraction of successful RPCs to log (default: 1.0).")
+    parser.add_argument("--log-sample-method", action="append", metavar="METHOD=RATE", help="Per-method sampling rate, e.g. Ping=0.01. Repeatable.")
+    parser.add_argument("--log-queue-size", type=int, default=DEFAULT_QUEUE_SIZE, help=f"Records buffered before dropping (default: {DEFAULT_QUEUE_SIZE}).")
+    parser.add_argument("--metrics-address", default=None, help="Serve per-method metrics at http://ADDRESS/metrics, e.g. 127.0.0.1:9100.")
+    parser.add_argument("--metrics-file", default=None, help="Write the final metrics to this file when the server stops.")
+    parser.add_argument("--capture", default=None, help="Record every RPC to this capture file for grpc_replay.py.")
+    args = parser.parse_args()
+
+    log_stream = open(args.log_file, "a") if args.log_file else None
+    rpc_log = RpcLogWriter(log_stream, args.log_sample, parse_sample_rates(args.log_sample_method), args.log_queue_size)
+    observers = [rpc_log]
+
+    metrics = None
+    metrics_httpd = None
+    if args.metrics_address or args.metrics_file:
+        metrics = RpcMetrics()
+        observers.append(metrics)
+
+    capture = None
+    if args.capture:
+        capture = RpcCaptureWriter(args.capture)
+        observers.append(capture)
+
+    if args.metrics_address:
+        metrics_httpd = serve_metrics(metrics, args.metrics_address)
+        logging.info(f"Metrics served on http://{args.metrics_address}/metrics")
+
+    try:
+        if args.mode == "aio":
+            try:
+                asyncio.run(serve_aio(args.address, args.max_concurrent_rpcs, observers))
+            except KeyboardInterrupt:
+                pass
+        else:
+            serve(args.address, args.max_workers, args.max_concurrent_rpcs, observers)
+    finally:
+        if metrics_httpd:
+            metrics_httpd.shutdown()
+        if args.metrics_file:
+            metrics.write(args.metrics_file)
+            logging.info(f"Metrics written to {args.metrics_file}")
+        if capture:
+            capture.close()
+            logging.info(f"Capture: {capture.written} calls recorded to {args.capture}, {capture.dropped} dropped")
+        rpc_log.close()
+        logging.info(f"RPC log: {rpc_log.written} records written, {rpc_log.dropped} dropped")
+        if log_stream:
+            log_stream.close()
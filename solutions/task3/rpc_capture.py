@@ -0,0 +1,118 @@
+import heapq
+import struct
+import time
+
+from rpc_observers import QueuedRpcWriter
+
+# Compact capture of incoming RPCs for replay (see grpc_replay.py). The
+# request path only enqueues the call; a background thread serializes it and
+# appends it to the capture file. Like the log writer, calls are dropped and
+# counted rather than blocking the server when the queue is full. Records are
+# in completion order, so offsets are not strictly increasing.
+#
+#   header   b'GRPCCAP1' | f64 capture start (unix time)
+#   record   u32 length of the rest of the record
+#            f64 seconds since capture start
+#            u16 method length | method
+#            u16 metadata count | (u16 key length | key | u32 value length | value)*
+#            u32 request length | serialized request
+
+CAPTURE_MAGIC = b'GRPCCAP1'
+DEFAULT_QUEUE_SIZE = 100000
+
+class CapturedCall:
+    __slots__ = ('offset', 'method', 'metadata', 'request')
+
+    def __init__(self, offset, method, metadata, request):
+        self.offset = offset        # seconds since the capture started
+        self.method = method
+        self.metadata = metadata    # [(key, value)], values are str or bytes (-bin keys)
+        self.request = request      # serialized request bytes
+
+def encode_call(call, capture_start):
+    method = call.method.encode('utf-8')
+    parts = [struct.pack('>dH', call.start - capture_start, len(method)), method]
+
+    metadata = list(call.metadata or ())
+    parts.append(struct.pack('>H', len(metadata)))
+    for key, value in metadata:
+        key = key.encode('utf-8')
+        value = value.encode('utf-8') if isinstance(value, str) else bytes(value)
+        parts += [struct.pack('>H', len(key)), key, struct.pack('>I', len(value)), value]
+
+    request = call.request.SerializeToString() if call.request is not None else b''
+    parts += [struct.pack('>I', len(request)), request]
+
+    body = b''.join(parts)
+    return struct.pack('>I', len(body)) + body
+
+def decode_call(body):
+    offset, method_length = struct.unpack_from('>dH', body, 0)
+    pos = 10
+    method = body[pos:pos + method_length].decode('utf-8')
+    pos += method_length
+
+    metadata = []
+    count, = struct.unpack_from('>H', body, pos)
+    pos += 2
+    for _ in range(count):
+        key_length, = struct.unpack_from('>H', body, pos)
+        key = body[pos + 2:pos + 2 + key_length].decode('utf-8')
+        pos += 2 + key_length
+        value_length, = struct.unpack_from('>I', body, pos)
+        value = body[pos + 4:pos + 4 + value_length]
+        pos += 4 + value_length
+        metadata.append((key, value if key.endswith('-bin') else value.decode('utf-8')))
+
+    request_length, = struct.unpack_from('>I', body, pos)
+    request = body[pos + 4:pos + 4 + request_length]
+    return CapturedCall(offset, method, metadata, request)
+
+def read_capture(path):
+    # Yield CapturedCall records in capture order; a torn last record is ignored
+    with open(path, 'rb') as f:
+        if f.read(len(CAPTURE_MAGIC)) != CAPTURE_MAGIC:
+            raise ValueError(f"{path}: not a gRPC capture file")
+        f.read(8)  # capture start
+        while True:
+            prefix = f.read(4)
+            if len(prefix) < 4:
+                return
+            length, = struct.unpack('>I', prefix)
+            body = f.read(length)
+            if len(body) < length:
+                return
+            yield decode_call(body)
+
+def iter_in_offset_order(calls, window=4096):
+    # Records are written as calls finish, so a slow call lands after calls
+    # that started later. Re-sort them by start offset within a sliding window
+    # (far larger than the number of calls in flight at once).
+    heap = []
+    for sequence, call in enumerate(calls):
+        heapq.heappush(heap, (call.offset, sequence, call))
+        if len(heap) > window:
+            yield heapq.heappop(heap)[2]
+    while heap:
+        yield heapq.heappop(heap)[2]
+
+class RpcCaptureWriter(QueuedRpcWriter):
+    thread_name = 'rpc-capture-writer'
+
+    def __init__(self, path, queue_size=DEFAULT_QUEUE_SIZE):
+        self.start = time.time()
+        self._out = open(path, 'wb')
+        self._out.write(CAPTURE_MAGIC + struct.pack('>d', self.start))
+        super().__init__(queue_size)
+
+    def rpc_finished(self, call):
+        if call.request is None:
+            return  # Nothing to replay for unknown methods
+        self.enqueue(call)
+
+    def write_batch(self, calls):
+        self._out.write(b''.join(encode_call(call, self.start) for call in calls))
+
+    def close(self):
+        super().close()
+        self._out.close()
@@ -0,0 +1,62 @@
+import json
+import random
+import sys
+
+from rpc_observers import QueuedRpcWriter, short_method_name
+
+# Structured per-RPC logging kept off the request path: the request thread
+# (or event loop) only samples the call and enqueues it, a background thread
+# formats the record and does the I/O. When the queue is full records are
+# dropped and counted rather than blocking the server.
+
+DEFAULT_QUEUE_SIZE = 10000
+
+def parse_sample_rates(specs):
+    # ['Ping=0.01', '/auth.AuthService/VerifyOTP=1'] -> {'Ping': 0.01, ...}
+    rates = {}
+    for spec in specs or ():
+        method, _, rate = spec.partition('=')
+        if not method or not rate:
+            raise ValueError(f"expected METHOD=RATE, got {spec!r}")
+        rates[method] = float(rate)
+    return rates
+
+class RpcLogWriter(QueuedRpcWriter):
+    thread_name = 'rpc-log-writer'
+
+    def __init__(self, stream=None, sample_rate=1.0, method_sample_rates=None, queue_size=DEFAULT_QUEUE_SIZE):
+        self.stream = stream or sys.stderr
+        self.sample_rate = sample_rate
+        self.method_sample_rates = dict(method_sample_rates or {})
+        super().__init__(queue_size)
+
+    def _rate(self, method):
+        rates = self.method_sample_rates
+        if method in rates:
+            return rates[method]
+        return rates.get(short_method_name(method), self.sample_rate)
+
+    def rpc_finished(self, call):
+        # Failed calls are always kept, successful ones are sampled
+        if call.code.name == 'OK':
+            rate = self._rate(call.method)
+            if rate < 1.0 and random.random() >= rate:
+                return
+        self.enqueue(call)
+
+    @staticmethod
+    def format_call(call):
+        record = {
+            'ts': round(call.start, 6),
+            'method': call.method,
+            'code': call.code.name,
+            'ms': round(call.duration * 1000, 3),
+            'metadata': {key: value if isinstance(value, str) else value.hex() for key, value in call.metadata or ()},
+        }
+        if call.request is not None:
+            record['request'] = str(call.request).strip()
+        return json.dumps(record)
+
+    def write_batch(self, calls):
+        self.stream.write(''.join(self.format_call(call) + '\n' for call in calls))
+        self.stream.flush()
@@ -0,0 +1,122 @@
+import bisect
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rpc_observers import RpcObserver
+
+# Per-method RPC metrics for the mock server, rendered in the Prometheus text
+# format: latency and message size histograms, status code counters and an
+# in-flight gauge. Served from a small local HTTP endpoint and/or written to a
+# file when the server stops.
+
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (16, 64, 256, 1024, 4096, 16384, 65536, 262144, 1048576)
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'count', 'sum')
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last slot is +Inf
+        self.count = 0
+        self.sum = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def render(self, name, labels):
+        lines = []
+        cumulative = 0
+        for bound, count in zip(self.buckets + ('+Inf',), self.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {cumulative}')
+        lines.append(f'{name}_sum{{{labels}}} {self.sum}')
+        lines.append(f'{name}_count{{{labels}}} {self.count}')
+        return lines
+
+def _message_size(message):
+    return message.ByteSize() if message is not None else 0
+
+class RpcMetrics(RpcObserver):
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.in_flight = {}
+        self.latency = {}
+        self.request_size = {}
+        self.response_size = {}
+        self.codes = {}
+
+    def rpc_started(self, method):
+        with self._lock:
+            self.in_flight[method] = self.in_flight.get(method, 0) + 1
+
+    def rpc_finished(self, call):
+        method = call.method
+        request_size = _message_size(call.request)
+        response_size = _message_size(call.response)
+        with self._lock:
+            self.in_flight[method] -= 1
+            if method not in self.latency:
+                self.latency[method] = Histogram(LATENCY_BUCKETS)
+                self.request_size[method] = Histogram(SIZE_BUCKETS)
+                self.response_size[method] = Histogram(SIZE_BUCKETS)
+            self.latency[method].observe(call.duration)
+            self.request_size[method].observe(request_size)
+            self.response_size[method].observe(response_size)
+            key = (method, call.code.name)
+            self.codes[key] = self.codes.get(key, 0) + 1
+
+    def render(self):
+        with self._lock:
+            lines = [
+                '# HELP grpc_server_in_flight RPCs currently being handled.',
+                '# TYPE grpc_server_in_flight gauge',
+            ]
+            lines += [f'grpc_server_in_flight{{method="{method}"}} {value}' for method, value in sorted(self.in_flight.items())]
+
+            lines += [
+                '# HELP grpc_server_handled_total RPCs completed, by status code.',
+                '# TYPE grpc_server_handled_total counter',
+            ]
+            lines += [f'grpc_server_handled_total{{method="{method}",code="{code}"}} {value}'
+                      for (method, code), value in sorted(self.codes.items())]
+
+            for name, help_text, histograms in (
+                ('grpc_server_handling_seconds', 'RPC handling latency.', self.latency),
+                ('grpc_server_request_bytes', 'Serialized request size.', self.request_size),
+                ('grpc_server_response_bytes', 'Serialized response size.', self.response_size),
+            ):
+                lines += [f'# HELP {name} {help_text}', f'# TYPE {name} histogram']
+                for method, histogram in sorted(histograms.items()):
+                    lines += histogram.render(name, f'method="{method}"')
+        return '\n'.join(lines) + '\n'
+
+    def write(self, path):
+        with open(path, 'w') as f:
+            f.write(self.render())
+
+def serve_metrics(metrics, address):
+    # Serve GET /metrics on a daemon thread; returns the HTTP server so the
+    # caller can shut it down
+    host, _, port = address.rpartition(':')
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/', '/metrics'):
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', 'text/plain; version=0.0.4')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass  # Keep scrapes out of the server log
+
+    httpd = ThreadingHTTPServer((host.strip('[]') or '127.0.0.1', int(port)), MetricsHandler)
+    threading.Thread(target=httpd.serve_forever, name='rpc-metrics', daemon=True).start()
+    return httpd
@@ -0,0 +1,171 @@
+import queue
+import threading
+import time
+
+import grpc
+
+# Interceptors that time every unary RPC and hand the finished call to a list
+# of observers (logging, metrics, capture). Observers run on the request path,
+# so they should only record and hand heavy work off to their own threads.
+
+class RpcCall:
+    __slots__ = ('method', 'metadata', 'request', 'response', 'code', 'start', 'duration')
+
+    def __init__(self, method, metadata, request, response, code, start, duration):
+        self.method = method
+        self.metadata = metadata
+        self.request = request
+        self.response = response
+        self.code = code
+        self.start = start          # time.time() when the call arrived
+        self.duration = duration    # seconds
+
+class RpcObserver:
+    def rpc_started(self, method):
+        pass
+
+    def rpc_finished(self, call):
+        pass
+
+class QueuedRpcWriter(RpcObserver):
+    """Base for observers that write calls out on a background thread. The
+    request path only enqueues; when the queue is full calls are dropped and
+    counted rather than blocking the server. Subclasses implement
+    write_batch() and must be fully set up before calling __init__, which
+    starts the thread."""
+
+    batch_size = 256
+    thread_name = 'rpc-writer'
+
+    def __init__(self, queue_size):
+        self.dropped = 0
+        self.written = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stopping = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=self.thread_name, daemon=True)
+        self._thread.start()
+
+    def enqueue(self, call):
+        try:
+            self._queue.put_nowait(call)
+        except queue.Full:
+            self.dropped += 1
+
+    def write_batch(self, calls):
+        raise NotImplementedError
+
+    def _run(self):
+        while not (self._stopping.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.2)]
+            except queue.Empty:
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self.write_batch(batch)
+            self.written += len(batch)
+
+    def close(self):
+        # Drain what is queued, then stop the writer thread
+        self._stopping.set()
+        self._thread.join()
+
+def short_method_name(method):
+    # '/auth.AuthService/Ping' -> 'Ping'
+    return method.rsplit('/', 1)[-1]
+
+def _status_code(context, default):
+    # ServicerContext.code() is only there on newer grpc releases
+    code = getattr(context, 'code', None)
+    code = code() if callable(code) else None
+    return code if code is not None else default
+
+class _Observed:
+    def __init__(self, observers):
+        self.observers = list(observers)
+
+    def _started(self, method):
+        for observer in self.observers:
+            observer.rpc_started(method)
+
+    def _finished(self, method, metadata, request, response, code, start, started_at):
+        call = RpcCall(method, metadata, request, response, code, start, time.perf_counter() - started_at)
+        for observer in self.observers:
+            observer.rpc_finished(call)
+
+    def _unimplemented(self, handler_call_details):
+        # No handler for the method: grpc answers UNIMPLEMENTED on its own
+        self._started(handler_call_details.method)
+        self._finished(handler_call_details.method, handler_call_details.invocation_metadata,
+                       None, None, grpc.StatusCode.UNIMPLEMENTED, time.time(), time.perf_counter())
+
+class ObservingInterceptor(_Observed, grpc.ServerInterceptor):
+    def intercept_service(self, continuation, handler_call_details):
+        handler = continuation(handler_call_details)
+        if handler is None:
+            self._unimplemented(handler_call_details)
+            return None
+        if handler.unary_unary is None:
+            return handler
+
+        method = handler_call_details.method
+        metadata = handler_call_details.invocation_metadata
+        inner = handler.unary_unary
+
+        def behavior(request, context):
+            start, started_at = time.time(), time.perf_counter()
+            self._started(method)
+            response = None
+            code = grpc.StatusCode.UNKNOWN
+            try:
+                response = inner(request, context)
+                code = _status_code(context, grpc.StatusCode.OK)
+                return response
+            except Exception:
+                code = _status_code(context, grpc.StatusCode.UNKNOWN)
+                raise
+            finally:
+                self._finished(method, metadata, request, response, code, start, started_at)
+
+        return grpc.unary_unary_rpc_method_handler(
+            behavior,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
+
+class AsyncObservingInterceptor(_Observed, grpc.aio.ServerInterceptor):
+    async def intercept_service(self, continuation, handler_call_details):
+        handler = await continuation(handler_call_details)
+        if handler is None:
+            self._unimplemented(handler_call_details)
+            return None
+        if handler.unary_unary is None:
+            return handler
+
+        method = handler_call_details.method
+        metadata = handler_call_details.invocation_metadata
+        inner = handler.unary_unary
+
+        async def behavior(request, context):
+            start, started_at = time.time(), time.perf_counter()
+            self._started(method)
+            response = None
+            code = grpc.StatusCode.UNKNOWN
+            try:
+                response = await inner(request, context)
+                code = _status_code(context, grpc.StatusCode.OK)
+                return response
+            except Exception:
+                code = _status_code(context, grpc.StatusCode.UNKNOWN)
+                raise
+            finally:
+                self._finished(method, metadata, request, response, code, start, started_at)
+
+        return grpc.unary_unary_rpc_method_handler(
+            behavior,
+            request_deserializer=handler.request_deserializer,
+            response_serializer=handler.response_serializer,
+        )
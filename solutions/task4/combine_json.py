@@ -1,41 +1,382 @@
 import json
 import glob
-import sys
 import os
+import argparse
+import contextlib
+import hashlib
+import stat
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 
-def combine_json_files(input_dir, output_file):
+# Output layouts: 'indent' matches the original json.dump(..., indent=4) array,
+# 'compact' is a single-line array and 'jsonl' is one record per line
+OUTPUT_FORMATS = ('indent', 'compact', 'jsonl')
+
+INDENT = '    '
+
+def serialize_json_file(file, output_format='indent'):
+    # Parse a single input file and re-serialize it as one output element
+    with open(file, 'rb') as f:
+        return serialize_json_bytes(f.read(), output_format)
+
+def serialize_json_file_with_digest(file, output_format='indent'):
+    # Same as serialize_json_file, but also hash the raw input for the manifest
+    with open(file, 'rb') as f:
+        raw = f.read()
+    return hashlib.sha256(raw).hexdigest(), serialize_json_bytes(raw, output_format)
+
+def serialize_json_bytes(raw, output_format='indent'):
+    return serialize_record(json.loads(raw), output_format)
+
+def serialize_record(data, output_format='indent'):
+    # Serialize one already-parsed record as an output element
+    if output_format == 'indent':
+        text = json.dumps(data, indent=4)
+        # Shift the element one level in, as it would be inside the array
+        text = '\n'.join(INDENT + line for line in text.split('\n'))
+    else:
+        text = json.dumps(data, separators=(',', ':'))
+    return text.encode('utf-8')
+
+def iter_serialized(json_files, output_format='indent', workers=None, task=serialize_json_file):
+    # Yield (file, task result) in input order. At most a fixed window of
+    # files is in flight, so memory stays bounded by the window, not the corpus.
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        for file in json_files:
+            yield file, task(file, output_format)
+        return
+
+    window = workers * 4
+    pending = deque()
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for file in json_files:
+            pending.append((file, executor.submit(task, file, output_format)))
+            if len(pending) >= window:
+                done_file, future = pending.popleft()
+                yield done_file, future.result()
+        while pending:
+            done_file, future = pending.popleft()
+            yield done_file, future.result()
+
+def element_framing(output_format):
+    # Return the (header, separator, footer) bytes that wrap the elements
+    if output_format == 'indent':
+        return b'[\n', b',\n', b'\n]'
+    if output_format == 'compact':
+        return b'[', b',', b']'
+    return b'', b'\n', b'\n'
+
+def write_elements(out, elements, output_format='indent', ranges=None, continued=False):
+    # Stream serialized elements into an open binary file, one at a time.
+    # If ranges is a list, the (offset, length) of each element is appended.
+    # With continued=True the elements extend an array that already has some.
+    # Returns the number of elements written.
+    header, separator, footer = element_framing(output_format)
+    count = 0
+    for element in elements:
+        out.write(separator if count or continued else header)
+        if ranges is not None:
+            ranges.append((out.tell(), len(element)))
+        out.write(element)
+        count += 1
+
+    if count == 0 and not continued:
+        # An empty array is '[]', an empty JSONL file is empty
+        if output_format != 'jsonl':
+            out.write(b'[]')
+    else:
+        out.write(footer)
+    return count
+
+def output_file_mode(output_file):
+    # Mode of the existing output, or the umask default for a new file
+    try:
+        return stat.S_IMODE(os.stat(output_file).st_mode)
+    except FileNotFoundError:
+        umask = os.umask(0)
+        os.umask(umask)
+        return 0o666 & ~umask
+
+@contextlib.contextmanager
+def replace_on_success(output_file):
+    # Yield a binary temp file in the output's directory that replaces the
+    # output only once it is fully written. If anything fails (an input that
+    # doesn't parse) the previous output is left as it was.
+    fd, tmp_file = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(output_file)), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            # mkstemp creates 0600 files; keep the permissions a plain open()
+            # would have given the output
+            os.fchmod(out.fileno(), output_file_mode(output_file))
+            yield out
+    except BaseException:
+        os.unlink(tmp_file)
+        raise
+    os.replace(tmp_file, output_file)
+
+def find_json_files(input_dir):
+    # Sorted so the output order does not depend on the filesystem
+    return sorted(glob.glob(os.path.join(input_dir, '*.json')))
+
+def iter_records(json_files):
+    # Yield (file, parsed record) for each input file, reading one at a time
+    for file in json_files:
+        with open(file, 'rb') as f:
+            yield file, json.load(f)
+
+def write_records(out, records, output_format='indent'):
+    # Write in-memory records (any iterable of JSON values) to an open binary
+    # stream in the same layout as combine_json_files, so records produced in
+    # the same process never have to go through per-record files.
+    # Returns the number of records written.
+    elements = (serialize_record(record, output_format) for record in records)
+    return write_elements(out, elements, output_format)
+
+def combine_json_files(input_dir, output_file, output_format='indent', workers=None):
     # Ensure input directory exists
     if not os.path.isdir(input_dir):
         print(f"Error: The directory '{input_dir}' does not exist.")
         return
 
     # Find all JSON files in the input directory
-    json_files = glob.glob(os.path.join(input_dir, '*.json'))
+    json_files = find_json_files(input_dir)
 
     if not json_files:
         print(f"No JSON files found in directory '{input_dir}'.")
         return
 
-    combined_json = []
+    # Stream each element to the output as soon as it is serialized
+    with replace_on_success(output_file) as out:
+        elements = (data for _, data in iter_serialized(json_files, output_format, workers))
+        write_elements(out, elements, output_format)
+
+    print(f"Combined JSON file created successfully as '{output_file}'.")
+
+# Incremental mode keeps a manifest next to the output recording, for every
+# input, its size, mtime and content hash plus the byte range of its element
+MANIFEST_SUFFIX = '.manifest.json'
+MANIFEST_VERSION = 1
+
+def manifest_path_for(output_file):
+    return output_file + MANIFEST_SUFFIX
+
+def file_digest(file):
+    h = hashlib.sha256()
+    with open(file, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+def load_manifest(output_file, output_format):
+    # Return the previous manifest, or None if the previous output can't be reused
+    try:
+        with open(manifest_path_for(output_file), 'r') as f:
+            manifest = json.load(f)
+        output_size = os.path.getsize(output_file)
+    except (OSError, ValueError):
+        return None
 
-    # Read and combine all JSON files
+    if manifest.get('version') != MANIFEST_VERSION or manifest.get('format') != output_format:
+        return None
+    if manifest.get('output_size') != output_size:
+        # The output was modified behind our back, so the ranges are stale
+        return None
+    return manifest
+
+def save_manifest(output_file, output_format, entries):
+    manifest = {
+        'version': MANIFEST_VERSION,
+        'format': output_format,
+        'output_size': os.path.getsize(output_file),
+        'entries': entries,
+    }
+    manifest_file = manifest_path_for(output_file)
+    with open(manifest_file + '.tmp', 'w') as f:
+        json.dump(manifest, f)
+    os.replace(manifest_file + '.tmp', manifest_file)
+
+def plan_incremental(json_files, manifest):
+    # Pair every input with its previous manifest entry if the element can be
+    # reused as-is, or with None if it has to be re-serialized
+    previous = {entry['path']: entry for entry in manifest['entries']} if manifest else {}
+    plan = []
     for file in json_files:
-        with open(file, 'r') as f:
-            data = json.load(f)
-            combined_json.append(data)
+        st = os.stat(file)
+        entry = previous.get(file)
+        if entry is not None and (entry['size'] != st.st_size or entry['mtime_ns'] != st.st_mtime_ns):
+            # Touched but possibly not modified: fall back to the content hash
+            if entry['size'] == st.st_size and file_digest(file) == entry['sha256']:
+                entry = dict(entry, mtime_ns=st.st_mtime_ns)
+            else:
+                entry = None
+        plan.append((file, st, entry))
+    return plan
 
-    # Save the combined JSON array to the specified output file
-    with open(output_file, 'w') as output_file:
-        json.dump(combined_json, output_file, indent=4)
+def combine_json_files_incremental(input_dir, output_file, output_format='indent', workers=None):
+    # Ensure input directory exists
+    if not os.path.isdir(input_dir):
+        print(f"Error: The directory '{input_dir}' does not exist.")
+        return
 
-    print(f"Combined JSON file created successfully as '{output_file}'.")
+    json_files = find_json_files(input_dir)
+    manifest = load_manifest(output_file, output_format)
+    old_entries = manifest['entries'] if manifest else []
+
+    plan = plan_incremental(json_files, manifest)
+    rebuild = [file for file, _, entry in plan if entry is None]
+    reused = len(plan) - len(rebuild)
+    present = set(json_files)
+    removed = sum(1 for entry in old_entries if entry['path'] not in present)
+
+    if manifest and not rebuild and not removed:
+        # Nothing to do apart from picking up refreshed mtimes
+        save_manifest(output_file, output_format, [entry for _, _, entry in plan])
+        print(f"'{output_file}' is up to date ({reused} entries).")
+        return
+
+    rebuilt = iter_serialized(rebuild, output_format, workers, task=serialize_json_file_with_digest)
+    new_entries = []
+
+    def elements(items):
+        # Yield element bytes in plan order, copying unchanged ones from the
+        # previous output and taking changed ones from the worker pool
+        for file, st, entry in items:
+            if entry is not None:
+                old_output.seek(entry['offset'])
+                data = old_output.read(entry['length'])
+                digest = entry['sha256']
+            else:
+                _, (digest, data) = next(rebuilt)
+            new_entries.append({'path': file, 'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'sha256': digest})
+            yield data
+
+    ranges = []
+    appendable = (
+        old_entries and not removed
+        and all(entry is not None and entry['path'] == old['path']
+                for (_, _, entry), old in zip(plan, old_entries))
+    )
+    if appendable:
+        # Every previous element is unchanged and still first: splice the new
+        # ones in over the old footer instead of rewriting the whole file
+        kept = [entry for _, _, entry in plan[:len(old_entries)]]
+        last = kept[-1]
+        # Parse every new input before touching the file, so a bad one leaves
+        # the previous output intact
+        appended = list(elements(plan[len(kept):]))
+        with open(output_file, 'r+b') as old_output:
+            old_output.seek(last['offset'] + last['length'])
+            old_output.truncate()
+            write_elements(old_output, appended, output_format, ranges, continued=True)
+        new_entries = kept + new_entries
+        ranges = [(entry['offset'], entry['length']) for entry in kept] + ranges
+    else:
+        old_output = open(output_file, 'rb') if manifest else None
+        try:
+            with replace_on_success(output_file) as out:
+                write_elements(out, elements(plan), output_format, ranges)
+        finally:
+            if old_output:
+                old_output.close()
+
+    for entry, (offset, length) in zip(new_entries, ranges):
+        entry['offset'] = offset
+        entry['length'] = length
+    save_manifest(output_file, output_format, new_entries)
+
+    print(f"Combined JSON file updated as '{output_file}': "
+          f"{len(rebuild)} rebuilt, {reused} reused, {removed} removed.")
+
+# Paged catalogue for catalogue_viewer.html: fixed-size pages of full records
+# plus a small index of the searchable fields, loaded via <script> tags so the
+# viewer also works from file://
+CATALOGUE_PAGE_SIZE = 100
+CATALOGUE_INDEX_FILE = 'index.js'
+CATALOGUE_INDEX_FIELDS = ('q', 'model', 'upstream', 'lang')
+
+def catalogue_page_file(page):
+    return f"page_{page:05d}.js"
+
+def catalogue_record(file, output_format='compact'):
+    # Return (index entry, compact record bytes) for one scraped {q, body} file
+    with open(file, 'rb') as f:
+        data = json.load(f)
+
+    body = data.get('body') if isinstance(data, dict) else None
+    body = body if isinstance(body, dict) else {}
+    entry = [data.get('q') if isinstance(data, dict) else None,
+             body.get('model'), body.get('upstream'), body.get('lang')]
+    entry = [value if isinstance(value, str) else '' for value in entry]
+    return (json.dumps(entry, separators=(',', ':')).encode('utf-8'),
+            json.dumps(data, separators=(',', ':')).encode('utf-8'))
+
+def write_catalogue_page(output_dir, page, records):
+    with open(os.path.join(output_dir, catalogue_page_file(page)), 'wb') as out:
+        out.write(f"catalogueLoadPage({page}, ".encode('utf-8'))
+        write_elements(out, records, 'compact')
+        out.write(b');\n')
+
+def write_catalogue(input_dir, output_dir, page_size=CATALOGUE_PAGE_SIZE, workers=None):
+    # Ensure input directory exists
+    if not os.path.isdir(input_dir):
+        print(f"Error: The directory '{input_dir}' does not exist.")
+        return
+
+    json_files = find_json_files(input_dir)
+
+    if not json_files:
+        print(f"No JSON files found in directory '{input_dir}'.")
+        return
+
+    os.makedirs(output_dir, exist_ok=True)
+
+    # The index is streamed as it goes; only the current page is held in memory
+    total = 0
+    page = []
+    with open(os.path.join(output_dir, CATALOGUE_INDEX_FILE), 'wb') as index:
+        index.write(b'var catalogueIndex = {"fields":')
+        index.write(json.dumps(CATALOGUE_INDEX_FIELDS, separators=(',', ':')).encode('utf-8'))
+        index.write(f',"pageSize":{page_size},"entries":'.encode('utf-8'))
+
+        def entries():
+            nonlocal total, page
+            for _, (entry, record) in iter_serialized(json_files, 'compact', workers, task=catalogue_record):
+                page.append(record)
+                if len(page) == page_size:
+                    write_catalogue_page(output_dir, total // page_size, page)
+                    page = []
+                total += 1
+                yield entry
+
+        write_elements(index, entries(), 'compact')
+        if page:
+            write_catalogue_page(output_dir, total // page_size, page)
+        pages = (total + page_size - 1) // page_size
+        index.write(f',"total":{total},"pages":{pages}}};\n'.encode('utf-8'))
+
+    print(f"Catalogue with {total} records in {pages} pages created in '{output_dir}'.")
 
 if __name__ == '__main__':
-    if len(sys.argv) != 3:
-        print("Usage: python combine_json.py <input_directory> <output_file>")
-        sys.exit(1)
-    
-    input_directory = sys.argv[1]
-    output_filename = sys.argv[2]
-    
-    combine_json_files(input_directory, output_filename)
+    parser = argparse.ArgumentParser(description="Combine a directory of JSON files into a single JSON array.")
+    parser.add_argument("input_directory", help="Directory containing the *.json files.")
+    parser.add_argument("output_file", nargs='?', help="Path of the combined output file (not used with --catalogue).")
+    parser.add_argument("--format", choices=OUTPUT_FORMATS, default='indent', help="Output layout (default: indent).")
+    parser.add_argument("--workers", type=int, default=None, help="Number of parser processes (default: CPU count).")
+    parser.add_argument("--incremental", action="store_true", help=f"Only rebuild inputs that changed since the last run, tracked in <output_file>{MANIFEST_SUFFIX}.")
+    parser.add_argument("--catalogue", metavar="DIR", default=None, help="Write a paged catalogue for catalogue_viewer.html into DIR instead.")
+    parser.add_argument("--page-size", type=int, default=CATALOGUE_PAGE_SIZE, help=f"Records per catalogue page (default: {CATALOGUE_PAGE_SIZE}).")
+
+    args = parser.parse_args()
+
+    if args.catalogue:
+        if args.output_file:
+            parser.error("--catalogue DIR writes to DIR; do not pass an output_file as well")
+        write_catalogue(args.input_directory, args.catalogue, args.page_size, args.workers)
+    elif not args.output_file:
+        parser.error("output_file is required unless --catalogue DIR is given")
+    elif args.incremental:
+        combine_json_files_incremental(args.input_directory, args.output_file, args.format, args.workers)
+    else:
+        combine_json_files(args.input_directory, args.output_file, args.format, args.workers)
@@ -109,32 +109,38 @@ def process_line(line, history):
         command += ' [Ctrl+C pressed]'
     return command
 
+def iter_commands(lines, history=None):
+    # Yield the command typed on each audit log line, skipping empty ones.
+    # Works on any iterable of lines (an open file, a list, a generator), so
+    # commands can be consumed as the log is read. history is the list of
+    # earlier commands the arrow keys navigate; it is extended as we go.
+    history = [] if history is None else history
+    for line in lines:
+        # Pass the command history to process_line
+        processed_command = process_line(line.rstrip('\n'), history)
+        if processed_command:
+            history.append(processed_command)
+            yield processed_command
+
+def write_commands(commands, out):
+    # Write one command per line to a text stream
+    for cmd in commands:
+        out.write(cmd + '\n')
+
 def parse_file_content(input_file):
-    commands = []
     with open(input_file, 'r', encoding='utf-8') as f:
-        lines = f.readlines()
-        i = 0
-        while i < len(lines):
-            line = lines[i].rstrip('\n')
-            # Pass the command history to process_line
-            processed_command = process_line(line, commands)
-            if processed_command:
-                commands.append(processed_command)
-            i += 1
-    return commands
+        return list(iter_commands(f))
 
-def main():
-    if len(sys.argv) != 3:
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 2:
         print("Usage: python transform.py <input_file> <output_file>")
         sys.exit(1)
-    input_file = sys.argv[1]
-    output_file = sys.argv[2]
+    input_file, output_file = argv
 
-    # Parse the content and write the commands to the output file
-    parsed_commands = parse_file_content(input_file)
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for cmd in parsed_commands:
-            f.write(cmd + '\n')
+    # Stream the commands straight to the output file
+    with open(input_file, 'r', encoding='utf-8') as f_in, open(output_file, 'w', encoding='utf-8') as f_out:
+        write_commands(iter_commands(f_in), f_out)
 
 if __name__ == "__main__":
     main()
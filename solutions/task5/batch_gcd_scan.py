@@ -0,0 +1,121 @@
+import argparse
+import os
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from Crypto.PublicKey import RSA
+import gmpy2
+
+from recover_password_crt_batch import product_tree
+
+# Companion to recover_password_crt.py: look for RSA moduli sharing a prime
+# across a corpus of public keys with batch GCD (Bernstein), in quasi-linear
+# time instead of pairwise GCDs.
+#
+# The moduli are cut into chunks. The product of every chunk is computed in
+# parallel and multiplied into the product P of all moduli. The parent reduces
+# P mod (chunk product)^2 for every chunk, and each worker only builds the
+# product/remainder tree of its own chunk from that residue, so P stays in
+# the parent and no process ever holds the full tree.
+
+DEFAULT_CHUNK_SIZE = 256
+
+def load_keys(key_dir):
+    # Return [(path, key)] for every RSA public key in the directory
+    keys = []
+    for name in sorted(os.listdir(key_dir)):
+        path = os.path.join(key_dir, name)
+        if not os.path.isfile(path):
+            continue
+        try:
+            with open(path, 'rb') as f:
+                keys.append((path, RSA.import_key(f.read())))
+        except (ValueError, IndexError, TypeError):
+            print(f"Skipping '{path}': not an RSA key")
+    return keys
+
+def product(values):
+    return product_tree([gmpy2.mpz(v) for v in values])[-1][0] if values else gmpy2.mpz(1)
+
+def chunk_gcds(task):
+    # gcd(n_i, P / n_i) for each modulus of the chunk via a remainder tree,
+    # starting from P mod (chunk product)^2
+    moduli, residue = task
+    tree = product_tree([gmpy2.mpz(n) for n in moduli])
+    remainders = [gmpy2.mpz(residue)]
+    for level in reversed(tree[:-1]):
+        remainders = [remainders[i // 2] % (value ** 2) for i, value in enumerate(level)]
+    return [int(gmpy2.gcd(r // n, n)) for r, n in zip(remainders, tree[0])]
+
+def batch_gcd(moduli, chunk_size=DEFAULT_CHUNK_SIZE, workers=None):
+    chunks = [moduli[i:i + chunk_size] for i in range(0, len(moduli), chunk_size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        chunk_products = list(executor.map(product, chunks))
+        total = product(chunk_products)
+
+        # Only the parent holds P; each worker gets the residue for its own
+        # chunk, and only a small window of residues exists at a time
+        window = (workers or os.cpu_count() or 1) * 2
+        gcds = []
+        pending = deque()
+        for chunk, chunk_product in zip(chunks, chunk_products):
+            pending.append(executor.submit(chunk_gcds, (chunk, total % (chunk_product ** 2))))
+            if len(pending) >= window:
+                gcds += pending.popleft().result()
+        while pending:
+            gcds += pending.popleft().result()
+        return gcds
+
+def split_modulus(n, g, moduli):
+    # Turn a non-trivial batch GCD into a prime factor of n. When g == n both
+    # primes are shared (with different keys), so fall back to pairwise GCDs
+    # against the other moduli; only a handful of keys ever get here.
+    if 1 < g < n:
+        return g
+    for other in moduli:
+        if other == n:
+            continue
+        g = gmpy2.gcd(n, other)
+        if 1 < g < n:
+            return int(g)
+    return None
+
+def scan(key_dir, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, out_dir=None):
+    keys = load_keys(key_dir)
+    moduli = [key.n for _, key in keys]
+    print(f"Loaded {len(keys)} RSA public keys from '{key_dir}'")
+    if len(moduli) < 2:
+        return []
+
+    gcds = batch_gcd(moduli, chunk_size, workers)
+    vulnerable = []
+    for (path, key), g in zip(keys, gcds):
+        if g == 1:
+            continue
+        p = split_modulus(key.n, g, moduli)
+        if p is None:
+            print(f"{path}: modulus duplicated in the corpus, cannot factor")
+            continue
+        q = key.n // p
+        d = int(gmpy2.invert(key.e, (p - 1) * (q - 1)))
+        vulnerable.append((path, key, p, q, d))
+        print(f"{path}: shares a factor, p={p:#x} d={d:#x}")
+
+        if out_dir:
+            os.makedirs(out_dir, exist_ok=True)
+            private_key = RSA.construct((key.n, key.e, d, p, q))
+            with open(os.path.join(out_dir, os.path.basename(path) + '.private.pem'), 'wb') as f:
+                f.write(private_key.export_key())
+
+    print(f"{len(vulnerable)} of {len(keys)} keys factored")
+    return vulnerable
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Find RSA public keys sharing prime factors with batch GCD.")
+    parser.add_argument("key_dir", help="Directory of RSA public keys (PEM/DER/OpenSSH).")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help=f"Moduli per worker chunk (default: {DEFAULT_CHUNK_SIZE}).")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: CPU count).")
+    parser.add_argument("--out-dir", default=None, help="Write recovered private keys as PEM files here.")
+    args = parser.parse_args()
+
+    scan(args.key_dir, args.chunk_size, args.workers, args.out_dir)
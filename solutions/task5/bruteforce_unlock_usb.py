@@ -1,32 +1,212 @@
+import argparse
+import json
+import os
+import shlex
 import subprocess
 import string
 import sys
-from itertools import product
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 
 # Define the fixed prefix of the password
 fixed_prefix = ";sY<TF1-EZc*v(nWO"
 
-# Character set for brute-forcing the last two characters
+# Character set for brute-forcing the last characters
 charset = string.ascii_letters + string.digits + string.punctuation
 
+# Oracle answer for a wrong password
+FAIL_MARKER = "Password incorrect."
+
+# The keyspace is every suffix from min_length to max_length characters,
+# numbered shortest first. It is cut into fixed-size chunks that a pool of
+# workers pulls in order; finished chunks are checkpointed so an interrupted
+# search resumes without redoing them.
+MAX_CHUNK_SIZE = 64
+
+class Keyspace:
+    def __init__(self, prefix, chars, min_length, max_length):
+        self.prefix = prefix
+        self.chars = chars
+        self.min_length = min_length
+        self.max_length = max_length
+        self.sizes = [len(chars) ** length for length in range(min_length, max_length + 1)]
+        self.total = sum(self.sizes)
+
+    def candidate(self, index):
+        # Map a global index to prefix + suffix
+        length = self.min_length
+        for size in self.sizes:
+            if index < size:
+                break
+            index -= size
+            length += 1
+        suffix = []
+        base = len(self.chars)
+        for _ in range(length):
+            index, digit = divmod(index, base)
+            suffix.append(self.chars[digit])
+        return self.prefix + ''.join(reversed(suffix))
+
+    def signature(self):
+        # Identifies the search so a checkpoint isn't applied to another one
+        return {'prefix': self.prefix, 'charset': self.chars,
+                'min_length': self.min_length, 'max_length': self.max_length}
+
 # Function to attempt unlocking
-def try_password(password):
-    process = subprocess.Popen(['/mnt/unlock'], stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+def try_password(oracle, password, fail_marker=FAIL_MARKER):
+    process = subprocess.Popen(oracle, stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
     stdout, stderr = process.communicate(input=f"{password}\n".encode())
-    
+
+    # A killed oracle (e.g. Ctrl+C reaching the whole process group) says
+    # nothing about the password
+    if process.returncode < 0:
+        return None
+
     # Check if the output does not contain "Password incorrect."
-    if b"Password incorrect." not in stdout + stderr:
+    if fail_marker.encode() not in stdout + stderr:
         return True
     return False
 
-# Generate all combinations of two characters from the charset
-for combo in product(charset, repeat=1):
-    # Form the password by appending the brute-forced characters to the fixed prefix
-    password = fixed_prefix + ''.join(combo)
-    
-    # Try the password
-    if try_password(password):
+def chunk_size_for(keyspace, workers):
+    # Small enough that every worker gets several chunks, capped so progress
+    # is checkpointed often
+    return max(1, min(MAX_CHUNK_SIZE, keyspace.total // (workers * 4)))
+
+class Checkpoint:
+    def __init__(self, path, keyspace, chunk_size):
+        self.path = path
+        self.signature = dict(keyspace.signature(), chunk_size=chunk_size)
+        self.next_chunk = 0     # every chunk below this is done
+        self.done = set()       # finished chunks at or above next_chunk
+        self.found = None
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                state = json.load(f)
+            if state.get('keyspace') == self.signature:
+                self.next_chunk = state['next_chunk']
+                self.done = set(state['done'])
+                self.found = state.get('found')
+            else:
+                print(f"Ignoring checkpoint '{path}': it is for a different keyspace")
+
+    def pending(self, chunk_count):
+        return (chunk for chunk in range(self.next_chunk, chunk_count) if chunk not in self.done)
+
+    def mark_done(self, chunk):
+        with self._lock:
+            self.done.add(chunk)
+            while self.next_chunk in self.done:
+                self.done.remove(self.next_chunk)
+                self.next_chunk += 1
+
+    def save(self, found=None):
+        if not self.path:
+            return
+        with self._lock:
+            state = {'keyspace': self.signature, 'next_chunk': self.next_chunk,
+                     'done': sorted(self.done), 'found': found}
+        with open(self.path + '.tmp', 'w') as f:
+            json.dump(state, f)
+        os.replace(self.path + '.tmp', self.path)
+
+def search(keyspace, oracle, workers=8, checkpoint_file=None, fail_marker=FAIL_MARKER,
+           chunk_size=None, report_every=5.0):
+    chunk_size = chunk_size or chunk_size_for(keyspace, workers)
+    chunk_count = (keyspace.total + chunk_size - 1) // chunk_size
+    checkpoint = Checkpoint(checkpoint_file, keyspace, chunk_size)
+    if checkpoint.found:
+        print(f"Already found in a previous run (see '{checkpoint_file}')")
+        return checkpoint.found
+    found = []
+    stop = threading.Event()
+    tried = 0
+    tried_lock = threading.Lock()
+
+    def run_chunk(chunk):
+        nonlocal tried
+        for index in range(chunk * chunk_size, min((chunk + 1) * chunk_size, keyspace.total)):
+            if stop.is_set():
+                return False
+            password = keyspace.candidate(index)
+            result = try_password(oracle, password, fail_marker)
+            if result is None:
+                return False  # Leave the chunk for the next run
+            if result:
+                found.append(password)
+                stop.set()
+            with tried_lock:
+                tried += 1
+        return True
+
+    remaining_at_start = keyspace.total - checkpoint.next_chunk * chunk_size - len(checkpoint.done) * chunk_size
+    print(f"Searching {keyspace.total} candidates ({max(remaining_at_start, 0)} left) with {workers} workers")
+    start = last_report = time.perf_counter()
+    chunks = checkpoint.pending(chunk_count)
+    running = {}
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        try:
+            while not stop.is_set():
+                # Keep every worker busy with a small backlog
+                while len(running) < workers * 2:
+                    chunk = next(chunks, None)
+                    if chunk is None:
+                        break
+                    running[executor.submit(run_chunk, chunk)] = chunk
+                if not running:
+                    break
+
+                finished, _ = wait(running, timeout=report_every, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    if future.result():
+                        checkpoint.mark_done(running[future])
+                    del running[future]
+
+                now = time.perf_counter()
+                if now - last_report >= report_every:
+                    last_report = now
+                    rate = tried / (now - start)
+                    left = max(remaining_at_start - tried, 0)
+                    eta = left / rate if rate else float('inf')
+                    print(f"{tried} tried, {rate:.1f}/s, ETA {eta:.0f}s")
+                    checkpoint.save()
+        except KeyboardInterrupt:
+            print("Interrupted, saving checkpoint...")
+            stop.set()
+            raise
+        finally:
+            stop.set()
+            wait(running)
+            for future, chunk in running.items():
+                if not future.exception() and future.result():
+                    checkpoint.mark_done(chunk)
+            checkpoint.save(found[0] if found else None)
+
+    elapsed = time.perf_counter() - start
+    print(f"{tried} candidates tried in {elapsed:.1f}s ({tried / elapsed if elapsed else 0:.1f}/s)")
+    return found[0] if found else None
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Brute-force the password suffix against an unlock oracle.")
+    parser.add_argument("--prefix", default=fixed_prefix, help="Known password prefix.")
+    parser.add_argument("--charset", default=charset, help="Characters to try (default: letters, digits and punctuation).")
+    parser.add_argument("--min-length", type=int, default=1, help="Shortest suffix to try (default: 1).")
+    parser.add_argument("--max-length", type=int, default=2, help="Longest suffix to try (default: 2).")
+    parser.add_argument("--oracle", default="/mnt/unlock", help="Oracle command, reads the password on stdin (default: /mnt/unlock).")
+    parser.add_argument("--fail-marker", default=FAIL_MARKER, help=f"Oracle output for a wrong password (default: {FAIL_MARKER!r}).")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Concurrent oracle processes (default: CPU count).")
+    parser.add_argument("--checkpoint", default="bruteforce.checkpoint", help="Progress file for resuming (default: bruteforce.checkpoint).")
+    args = parser.parse_args()
+
+    keyspace = Keyspace(args.prefix, args.charset, args.min_length, args.max_length)
+    try:
+        password = search(keyspace, shlex.split(args.oracle), args.workers, args.checkpoint, args.fail_marker)
+    except KeyboardInterrupt:
+        sys.exit(130)
+
+    if password is not None:
         print(f"Password found: {password}")
         sys.exit(0)  # Exit the script once a valid password is found
-    else:
-        print(f"Tried password: {password} - Incorrect")
\ No newline at end of file
+    print("Password not found in keyspace.")
+    sys.exit(1)
@@ -0,0 +1,132 @@
+import argparse
+import base64
+import binascii
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from Crypto.PublicKey import RSA
+import gmpy2
+
+# Batch version of recover_password_crt.py: Håstad's broadcast attack over any
+# number of (public key, ciphertext) pairs. Pairs are listed one per line in
+# a pairs file:
+#
+#   <public key file> <ciphertext file> [message id]
+#
+# Ciphertext files hold base64 or raw bytes. Pairs are grouped by exponent e
+# and message id (lines without one share a default id), and each group is
+# solved with a product-tree CRT and a single integer e-th root.
+
+DEFAULT_MESSAGE = 'default'
+
+def read_ciphertext(path):
+    with open(path, 'rb') as f:
+        data = f.read()
+    try:
+        data = base64.b64decode(b''.join(data.split()), validate=True)
+    except (binascii.Error, ValueError):
+        pass  # Raw ciphertext
+    return int.from_bytes(data, byteorder='big')
+
+def load_pairs(pairs_file):
+    # Return {(e, message id): [(n, c), ...]}, relative paths resolved against
+    # the pairs file
+    base_dir = os.path.dirname(os.path.abspath(pairs_file))
+    groups = {}
+    with open(pairs_file, 'r') as f:
+        for line in f:
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            key_path, ciphertext_path = (os.path.join(base_dir, path) for path in fields[:2])
+            message = fields[2] if len(fields) > 2 else DEFAULT_MESSAGE
+            with open(key_path, 'r') as key_file:
+                key = RSA.import_key(key_file.read())
+            groups.setdefault((key.e, message), []).append((key.n, read_ciphertext(ciphertext_path)))
+    return groups
+
+def product_tree(values):
+    # Leaves first, root last
+    tree = [list(values)]
+    while len(tree[-1]) > 1:
+        level = tree[-1]
+        tree.append([level[i] * level[i + 1] if i + 1 < len(level) else level[i]
+                     for i in range(0, len(level), 2)])
+    return tree
+
+def tree_crt(moduli, residues):
+    # CRT by merging neighbouring solutions up the product tree: one modular
+    # inverse per internal node instead of N // n_i for every modulus
+    tree = product_tree([gmpy2.mpz(n) for n in moduli])
+    solutions = [gmpy2.mpz(c) % n for n, c in zip(tree[0], residues)]
+    for level in tree[:-1]:
+        merged = []
+        for i in range(0, len(level), 2):
+            if i + 1 == len(level):
+                merged.append(solutions[i])
+                continue
+            n_left, n_right = level[i], level[i + 1]
+            x_left, x_right = solutions[i], solutions[i + 1]
+            t = ((x_right - x_left) * gmpy2.invert(n_left, n_right)) % n_right
+            merged.append(x_left + n_left * t)
+        solutions = merged
+    return solutions[0], tree[-1][0]
+
+def strip_pkcs1_v15(plaintext_bytes):
+    # Strip the PKCS#1 v1.5 padding
+    if plaintext_bytes.startswith(b'\x02'):
+        # to_bytes drops the leading 0x00 of the encoded block
+        plaintext_bytes = b'\x00' + plaintext_bytes
+    if plaintext_bytes.startswith(b'\x00\x02'):
+        # Find the first occurrence of \x00 after the padding
+        separator_index = plaintext_bytes.find(b'\x00', 2)
+        if separator_index != -1:
+            return plaintext_bytes[separator_index + 1:]
+    return plaintext_bytes
+
+def solve_group(e, pairs):
+    # Return (plaintext bytes or None, status message)
+    unique = {}
+    for n, c in pairs:
+        if unique.setdefault(n, c) != c:
+            return None, "same modulus with different ciphertexts (not a broadcast of one message)"
+    if len(unique) < e:
+        return None, f"need at least {e} distinct moduli, have {len(unique)}"
+
+    moduli = list(unique)
+    try:
+        x, _ = tree_crt(moduli, [unique[n] for n in moduli])
+    except ZeroDivisionError:
+        return None, "moduli are not pairwise coprime (see the batch-GCD scanner)"
+
+    m, exact = gmpy2.iroot(x, e)
+    if not exact:
+        return None, f"CRT result is not a perfect {e}th power"
+    plaintext_bytes = int(m).to_bytes((m.bit_length() + 7) // 8, byteorder='big')
+    return strip_pkcs1_v15(plaintext_bytes), f"recovered from {len(moduli)} moduli"
+
+def _solve_group_task(item):
+    (e, message), pairs = item
+    plaintext, status = solve_group(e, pairs)
+    return e, message, plaintext, status
+
+def recover_all(pairs_file, workers=None):
+    groups = load_pairs(pairs_file)
+    results = {}
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for e, message, plaintext, status in executor.map(_solve_group_task, sorted(groups.items())):
+            results[(e, message)] = plaintext
+            if plaintext is None:
+                print(f"[e={e}, message={message}] failed: {status}")
+            else:
+                # Convert to string and print the recovered plaintext
+                print(f"[e={e}, message={message}] {status}: {plaintext.decode('utf-8', errors='ignore')}")
+    return results
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Batch Håstad broadcast recovery over (public key, ciphertext) pairs.")
+    parser.add_argument("pairs_file", help="File with '<key file> <ciphertext file> [message id]' lines.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes (default: CPU count).")
+    args = parser.parse_args()
+
+    recover_all(args.pairs_file, args.workers)
@@ -0,0 +1,152 @@
+import argparse
+import base64
+import binascii
+
+import numpy as np
+
+# Many-time-pad solver, the general form of recover_password_ksca.py: any
+# number of IV-prefixed ciphertexts are grouped by IV (same IV = same
+# keystream). Each keystream byte comes from a known plaintext where one
+# covers that position; elsewhere every candidate byte is scored against all
+# ciphertexts of the group at once (crib-dragging with NumPy, from a
+# per-column byte histogram) and the best one kept. Each decryption is
+# reported with a confidence score.
+
+IV_LENGTH = 16
+
+# Per-byte plausibility of plaintext: English letter frequencies, space and
+# common punctuation score high, other printable ASCII a little, control and
+# high bytes are heavily penalised.
+def build_byte_scores():
+    scores = np.full(256, -10.0)
+    scores[0x20:0x7f] = 0.5
+    scores[ord('\t')] = scores[ord('\n')] = 0.5
+    frequencies = {
+        'e': 12.7, 't': 9.1, 'a': 8.2, 'o': 7.5, 'i': 7.0, 'n': 6.7, 's': 6.3, 'h': 6.1, 'r': 6.0,
+        'd': 4.3, 'l': 4.0, 'c': 2.8, 'u': 2.8, 'm': 2.4, 'w': 2.4, 'f': 2.2, 'g': 2.0, 'y': 2.0,
+        'p': 1.9, 'b': 1.5, 'v': 1.0, 'k': 0.8, 'j': 0.2, 'x': 0.2, 'q': 0.1, 'z': 0.1,
+    }
+    for letter, frequency in frequencies.items():
+        scores[ord(letter)] = 1.0 + frequency / 4
+        scores[ord(letter.upper())] = 0.8 + frequency / 8
+    scores[ord(' ')] = 5.0
+    for c in '.,\'"-!?:;':
+        scores[ord(c)] = 1.0
+    scores[ord('0'):ord('9') + 1] = 1.0
+    return scores
+
+BYTE_SCORES = build_byte_scores()
+# CANDIDATE_SCORES[b, k] is the score of ciphertext byte b under keystream
+# byte k, i.e. BYTE_SCORES[b ^ k]
+CANDIDATE_SCORES = BYTE_SCORES[np.arange(256)[:, None] ^ np.arange(256)[None, :]]
+_COLUMN_BLOCK = 4096
+
+def parse_ciphertext(line):
+    # Hex or base64, IV first
+    line = line.strip()
+    try:
+        return bytes.fromhex(line)
+    except ValueError:
+        return base64.b64decode(line, validate=True)
+
+def group_by_iv(ciphertexts, iv_length=IV_LENGTH):
+    # {iv: [(index, ciphertext without IV)]}
+    groups = {}
+    for index, data in enumerate(ciphertexts):
+        groups.setdefault(data[:iv_length], []).append((index, data[iv_length:]))
+    return groups
+
+def solve_keystream(ciphertexts, known=None):
+    # Recover the shared keystream for one IV group. Returns (keystream bytes,
+    # per-position confidence in [0, 1]); known maps a ciphertext position in
+    # the group to its known plaintext bytes.
+    length = max(len(c) for c in ciphertexts)
+    matrix = np.zeros((len(ciphertexts), length), dtype=np.uint8)
+    present = np.zeros((len(ciphertexts), length), dtype=bool)
+    for row, ciphertext in enumerate(ciphertexts):
+        matrix[row, :len(ciphertext)] = np.frombuffer(ciphertext, dtype=np.uint8)
+        present[row, :len(ciphertext)] = True
+
+    keystream = np.zeros(length, dtype=np.uint8)
+    confidence = np.zeros(length)
+
+    # Per-column histogram of ciphertext bytes: scoring a candidate only
+    # needs how often each byte occurs, so the work below does not grow
+    # with the number of ciphertexts
+    columns = np.broadcast_to(np.arange(length), matrix.shape)
+    counts = np.bincount((columns * 256 + matrix)[present], minlength=length * 256)
+    counts = counts.reshape(length, 256).astype(np.float64)
+    rows = np.maximum(present.sum(axis=0), 1)
+
+    # Score all 256 candidates for every column: (columns, 256) per block
+    for start in range(0, length, _COLUMN_BLOCK):
+        block = slice(start, min(start + _COLUMN_BLOCK, length))
+        scores = counts[block] @ CANDIDATE_SCORES
+        order = np.argsort(scores, axis=1)
+        best, second = order[:, -1], order[:, -2]
+        index = np.arange(scores.shape[0])
+        best_score, second_score = scores[index, best], scores[index, second]
+        keystream[block] = best
+        # Margin over the runner-up, per contributing ciphertext, squashed to [0, 1)
+        confidence[block] = 1 - np.exp(-np.maximum(best_score - second_score, 0) / rows[block])
+
+    # Known plaintexts override the statistics wherever they reach
+    for row, plaintext in (known or {}).items():
+        covered = min(len(plaintext), len(ciphertexts[row]))
+        keystream[:covered] = matrix[row, :covered] ^ np.frombuffer(plaintext[:covered], dtype=np.uint8)
+        confidence[:covered] = 1.0
+    return keystream.tobytes(), confidence
+
+def decrypt(ciphertext, keystream):
+    length = min(len(ciphertext), len(keystream))
+    return (np.frombuffer(ciphertext[:length], dtype=np.uint8)
+            ^ np.frombuffer(keystream[:length], dtype=np.uint8)).tobytes()
+
+def solve(ciphertexts, known=None, iv_length=IV_LENGTH):
+    # known maps a global ciphertext index to its plaintext bytes. Returns
+    # [(index, iv, plaintext, confidence)] in input order.
+    known = known or {}
+    results = []
+    for iv, members in group_by_iv(ciphertexts, iv_length).items():
+        group_known = {row: known[index] for row, (index, _) in enumerate(members) if index in known}
+        keystream, confidence = solve_keystream([c for _, c in members], group_known)
+        for index, ciphertext in members:
+            score = float(confidence[:len(ciphertext)].mean()) if ciphertext else 1.0
+            results.append((index, iv, decrypt(ciphertext, keystream), score))
+    return sorted(results)
+
+def read_known(path):
+    # '<ciphertext index> <plaintext>' per line, index counted from 0
+    known = {}
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.rstrip('\n')
+            if not line.strip():
+                continue
+            index, _, plaintext = line.partition(' ')
+            known[int(index)] = plaintext.encode('utf-8')
+    return known
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Recover plaintexts from ciphertexts encrypted with a reused IV/keystream.")
+    parser.add_argument("ciphertexts_file", help="One IV-prefixed ciphertext per line, hex or base64.")
+    parser.add_argument("--known", default=None, help="File of '<ciphertext index> <plaintext>' lines.")
+    parser.add_argument("--iv-length", type=int, default=IV_LENGTH, help=f"IV prefix length in bytes (default: {IV_LENGTH}).")
+    parser.add_argument("--output", default=None, help="Also write the decryptions, one per line, to this file.")
+    args = parser.parse_args()
+
+    with open(args.ciphertexts_file, 'r') as f:
+        try:
+            ciphertexts = [parse_ciphertext(line) for line in f if line.strip()]
+        except (ValueError, binascii.Error) as e:
+            parser.error(f"cannot decode ciphertext: {e}")
+    known = read_known(args.known) if args.known else {}
+
+    results = solve(ciphertexts, known, args.iv_length)
+    for index, iv, plaintext, score in results:
+        print(f"[{index}] iv={iv.hex()} confidence={score:.2f} {plaintext!r}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for _, _, plaintext, _ in results:
+                f.write(plaintext.decode('utf-8', errors='replace') + '\n')
@@ -0,0 +1,253 @@
+import argparse
+import hashlib
+import mmap
+import struct
+import sys
+
+# Reader for the eszip v2 archives embedded in Deno standalone binaries (see
+# extractor.py). Layout, all integers big-endian:
+#
+#   magic (8)                  ESZIP_V2 | ESZIP2.1 | ESZIP2.2
+#   [options section]          ESZIP2.2 only: (option id, value) byte pairs
+#   modules header section     specifier table, see _parse_modules_header
+#   [npm snapshot section]     ESZIP2.1 and later
+#   sources section            module sources, each followed by a checksum
+#   source maps section        same, for source maps
+#
+# A section is a u32 length, the content and a checksum of the content. Only
+# the modules header is parsed up front; module bodies are read on demand.
+MAGIC_V2 = b'ESZIP_V2'
+MAGIC_V2_1 = b'ESZIP2.1'
+MAGIC_V2_2 = b'ESZIP2.2'
+MAGICS = (MAGIC_V2, MAGIC_V2_1, MAGIC_V2_2)
+
+ENTRY_MODULE = 0
+ENTRY_REDIRECT = 1
+ENTRY_NPM_SPECIFIER = 2
+
+MODULE_KINDS = {
+    0: 'JavaScript',
+    1: 'Json',
+    2: 'Jsonc',
+    3: 'OpaqueData',
+    4: 'Wasm',
+}
+
+OPTION_CHECKSUM = 0
+OPTION_CHECKSUM_SIZE = 1
+
+# Checksum type -> digest size
+CHECKSUM_SIZES = {
+    0: 0,   # none
+    1: 32,  # sha256
+    2: 8,   # xxhash3
+}
+
+class EszipError(ValueError):
+    pass
+
+class EszipModule:
+    """Index entry for one specifier. offset/length locate the source in the
+    archive buffer; redirects carry their target instead."""
+
+    __slots__ = ('specifier', 'kind', 'offset', 'length', 'source_map_offset', 'source_map_length', 'target')
+
+    def __init__(self, specifier, kind, offset=0, length=0, source_map_offset=0, source_map_length=0, target=None):
+        self.specifier = specifier
+        self.kind = kind
+        self.offset = offset
+        self.length = length
+        self.source_map_offset = source_map_offset
+        self.source_map_length = source_map_length
+        self.target = target
+
+    def __repr__(self):
+        return f"EszipModule({self.specifier!r}, {self.kind!r}, offset={self.offset}, length={self.length})"
+
+class EszipArchive:
+    """Lazy eszip v2 reader over any buffer (bytes, mmap or memoryview, e.g. a
+    StandaloneBinary section). Building the index only touches the header.
+    Use as a context manager (or call release()) so the caller's buffer can be
+    closed afterwards."""
+
+    def __init__(self, buffer):
+        self._view = memoryview(buffer)
+        self.modules = {}
+        try:
+            self._parse()
+        except BaseException:
+            # Don't keep the caller's buffer exported past a failed parse
+            self._view.release()
+            raise
+
+    def _read_u32(self, pos):
+        if pos + 4 > len(self._view):
+            raise EszipError(f"truncated archive at offset {pos}")
+        return struct.unpack_from('>I', self._view, pos)[0], pos + 4
+
+    def _read_section(self, pos):
+        # Return (content start, content length, position after the checksum)
+        length, pos = self._read_u32(pos)
+        end = pos + length + self.checksum_size
+        if end > len(self._view):
+            raise EszipError(f"section at offset {pos - 4} runs past the end of the archive")
+        return pos, length, end
+
+    def _parse(self):
+        magic = bytes(self._view[:8])
+        if magic not in MAGICS:
+            raise EszipError(f"not an eszip v2 archive (magic {magic!r})")
+        self.version = magic.decode()
+        pos = 8
+
+        self.checksum_size = CHECKSUM_SIZES[1]
+        if magic == MAGIC_V2_2:
+            pos = self._parse_options(pos)
+
+        header_start, header_length, pos = self._read_section(pos)
+
+        if magic != MAGIC_V2:
+            # Skip the npm snapshot, we only need the modules
+            _, _, pos = self._read_section(pos)
+
+        sources_length, sources_start = self._read_u32(pos)
+        source_maps_length, source_maps_start = self._read_u32(sources_start + sources_length)
+        self._parse_modules_header(header_start, header_length, sources_start, source_maps_start)
+
+    def _parse_options(self, pos):
+        length, pos = self._read_u32(pos)
+        options = bytes(self._view[pos:pos + length])
+        if len(options) != length or length % 2:
+            raise EszipError("malformed options header")
+        checksum_size = None
+        for option, value in zip(options[::2], options[1::2]):
+            if option == OPTION_CHECKSUM:
+                if value not in CHECKSUM_SIZES:
+                    raise EszipError(f"unsupported checksum type {value}")
+                self.checksum_size = CHECKSUM_SIZES[value]
+            elif option == OPTION_CHECKSUM_SIZE:
+                checksum_size = value
+        if checksum_size is not None:
+            self.checksum_size = checksum_size
+        # The options header is itself followed by its checksum
+        return pos + length + self.checksum_size
+
+    def _parse_modules_header(self, pos, length, sources_start, source_maps_start):
+        view = self._view
+        end = pos + length
+        while pos < end:
+            specifier_length, pos = self._read_u32(pos)
+            specifier = bytes(view[pos:pos + specifier_length]).decode('utf-8')
+            pos += specifier_length
+            entry_kind = view[pos]
+            pos += 1
+
+            if entry_kind == ENTRY_MODULE:
+                source_offset, source_length, map_offset, map_length = struct.unpack_from('>4I', view, pos)
+                module_kind = view[pos + 16]
+                pos += 17
+                self.modules[specifier] = EszipModule(
+                    specifier, MODULE_KINDS.get(module_kind, f'Unknown({module_kind})'),
+                    sources_start + source_offset, source_length,
+                    source_maps_start + map_offset, map_length,
+                )
+            elif entry_kind == ENTRY_REDIRECT:
+                target_length, pos = self._read_u32(pos)
+                target = bytes(view[pos:pos + target_length]).decode('utf-8')
+                pos += target_length
+                self.modules[specifier] = EszipModule(specifier, 'Redirect', target=target)
+            elif entry_kind == ENTRY_NPM_SPECIFIER:
+                package_id, pos = self._read_u32(pos)
+                self.modules[specifier] = EszipModule(specifier, 'NpmSpecifier', target=package_id)
+            else:
+                raise EszipError(f"unknown entry kind {entry_kind} for {specifier!r}")
+
+    def resolve(self, specifier):
+        # Follow redirects to the module that actually holds the source
+        seen = set()
+        module = self.modules[specifier]
+        while module.kind == 'Redirect':
+            if module.specifier in seen:
+                raise EszipError(f"redirect loop at {specifier!r}")
+            seen.add(module.specifier)
+            module = self.modules[module.target]
+        return module
+
+    def source_view(self, specifier):
+        # Zero-copy view of a module's source
+        module = self.resolve(specifier)
+        return self._view[module.offset:module.offset + module.length]
+
+    def source(self, specifier):
+        return bytes(self.source_view(specifier))
+
+    def source_map(self, specifier):
+        module = self.resolve(specifier)
+        return bytes(self._view[module.source_map_offset:module.source_map_offset + module.source_map_length])
+
+    def verify(self, specifier):
+        # Check a module source against its stored sha256, where present
+        module = self.resolve(specifier)
+        if self.checksum_size != CHECKSUM_SIZES[1]:
+            return None
+        stored = self._view[module.offset + module.length:module.offset + module.length + self.checksum_size]
+        return hashlib.sha256(self.source_view(specifier)).digest() == stored
+
+    def iter_sources(self, kinds=None):
+        # Yield (module, source view) for every module that has a source
+        for module in self.modules.values():
+            if module.kind in ('Redirect', 'NpmSpecifier'):
+                continue
+            if kinds is not None and module.kind not in kinds:
+                continue
+            yield module, self.source_view(module.specifier)
+
+    def release(self):
+        self._view.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class EszipFile(EszipArchive):
+    """EszipArchive over a memory-mapped eszip file on disk."""
+
+    def __init__(self, path):
+        self._file = open(path, 'rb')
+        self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            super().__init__(self._mm)
+        except BaseException:
+            self._mm.close()
+            self._file.close()
+            raise
+
+    def close(self):
+        self.release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="List the modules of an eszip archive.")
+    parser.add_argument("eszip_file", help="eszip archive, e.g. the eszip_archive written by extractor.py.")
+    args = parser.parse_args()
+
+    try:
+        with EszipFile(args.eszip_file) as archive:
+            print(f"{archive.version}: {len(archive.modules)} entries")
+            for module in archive.modules.values():
+                if module.target is not None:
+                    print(f"{module.kind:<12} {module.specifier} -> {module.target}")
+                else:
+                    print(f"{module.kind:<12} {module.specifier} ({module.length} bytes)")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -1,77 +1,233 @@
+import argparse
+import hashlib
+import json
+import mmap
+import os
 import struct
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
-# Define the binary file name
-binary_file = 'microservice'  # Replace with your binary file name
-
-# Given data in hex strings
-magic_signature_hex = '64 33 6e 30 6c 34 6e 64'
-eszip_pos_hex = '00 00 00 00 04 fa ba 30'
-metadata_pos_hex = '00 00 00 00 05 00 92 79'
-null_pos_hex = '00 00 00 00 05 00 99 1d'
-signature_pos_hex = '00 00 00 00 05 01 f4 6e'
-
-# Convert hex strings to bytes
-def hex_str_to_bytes(hex_str):
-    return bytes.fromhex(hex_str.replace(' ', ''))
-
-magic_signature = hex_str_to_bytes(magic_signature_hex)
-eszip_pos_bytes = hex_str_to_bytes(eszip_pos_hex)
-metadata_pos_bytes = hex_str_to_bytes(metadata_pos_hex)
-null_pos_bytes = hex_str_to_bytes(null_pos_hex)
-signature_pos_bytes = hex_str_to_bytes(signature_pos_hex)
-
-# Convert big-endian bytes to integers
-def be_bytes_to_int(b):
-    return int.from_bytes(b, byteorder='big')
-
-eszip_pos = be_bytes_to_int(eszip_pos_bytes)
-metadata_pos = be_bytes_to_int(metadata_pos_bytes)
-null_pos = be_bytes_to_int(null_pos_bytes)
-signature_pos = be_bytes_to_int(signature_pos_bytes)
-
-# Calculate sizes
-eszip_size = metadata_pos - eszip_pos
-metadata_size = null_pos - metadata_pos
-signature_size = 8  # The magic signature is 8 bytes
-
-print(f"ESZIP position: {eszip_pos}")
-print(f"Metadata position: {metadata_pos}")
-print(f"Null position: {null_pos}")
-print(f"Signature position: {signature_pos}")
-
-print(f"ESZIP size: {eszip_size} bytes")
-print(f"Metadata size: {metadata_size} bytes")
-
-# Read the binary file and extract the data
-with open(binary_file, 'rb') as f:
-    # Extract ESZIP archive
-    f.seek(eszip_pos)
-    eszip_data = f.read(eszip_size)
-    with open('eszip_archive', 'wb') as eszip_file:
-        eszip_file.write(eszip_data)
-    print("ESZIP archive extracted to 'eszip_archive'.")
-
-    # Extract metadata JSON
-    f.seek(metadata_pos)
-    metadata_data = f.read(metadata_size)
-    with open('metadata.json', 'wb') as metadata_file:
-        metadata_file.write(metadata_data)
-    print("Metadata extracted to 'metadata.json'.")
-
-    # Extract the magic signature
-    f.seek(signature_pos)
-    signature_data = f.read(signature_size)
-    print(f"Signature data: {signature_data}")
-
-    # Verify the signature
-    if signature_data == magic_signature:
-        print("Magic signature verified: d3n0l4nd")
-    else:
-        print("Magic signature does not match.")
-
-    # Optionally, extract the last 40 bytes (footer)
-    f.seek(-40, 2)  # 2 means relative to file end
-    footer_data = f.read(40)
-    with open('binary_footer', 'wb') as footer_file:
-        footer_file.write(footer_data)
-    print("Binary footer extracted to 'binary_footer'.")
+from eszip_reader import EszipArchive
+
+# A Deno standalone binary is the deno runtime with the payload appended and a
+# trailer at the very end of the file:
+#
+#   d3n0l4nd | eszip_pos | metadata_pos | npm_vfs_pos | npm_files_pos
+#
+# where every position is a big-endian u64. Older builds only carry the first
+# two positions (24-byte trailer). Each section runs up to the next position,
+# and the last one up to the start of the trailer.
+TRAILER_MAGIC = b'd3n0l4nd'
+SECTION_NAMES = ('eszip', 'metadata', 'npm_vfs', 'npm_files')
+
+# Output file names used when writing the sections out
+SECTION_FILES = {
+    'eszip': 'eszip_archive',
+    'metadata': 'metadata.json',
+    'npm_vfs': 'npm_vfs',
+    'npm_files': 'npm_files',
+}
+FOOTER_FILE = 'binary_footer'
+
+COPY_CHUNK_SIZE = 1 << 20
+
+class StandaloneBinary:
+    """Memory-mapped Deno standalone binary with its payload sections located
+    from the trailer. Section views are zero-copy slices of the mapping and
+    must be released before close()."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'rb')
+        try:
+            self._mm = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            # Empty files can't be mapped
+            self._file.close()
+            raise ValueError(f"{path}: empty file, no Deno trailer")
+        self._view = memoryview(self._mm)
+        try:
+            self.trailer_pos, self.sections = self._parse_trailer()
+        except ValueError:
+            self.close()
+            raise
+
+    def _parse_trailer(self):
+        size = len(self._mm)
+        for count in (4, 2):
+            trailer_size = len(TRAILER_MAGIC) + 8 * count
+            trailer_pos = size - trailer_size
+            if trailer_pos < 0 or self._mm[trailer_pos:trailer_pos + len(TRAILER_MAGIC)] != TRAILER_MAGIC:
+                continue
+
+            positions = struct.unpack_from(f'>{count}Q', self._mm, trailer_pos + len(TRAILER_MAGIC))
+            bounds = list(positions) + [trailer_pos]
+            if any(start > end for start, end in zip(bounds, bounds[1:])):
+                raise ValueError(f"{self.path}: trailer section offsets are out of order: {positions}")
+
+            sections = {
+                name: (start, end)
+                for name, start, end in zip(SECTION_NAMES, bounds, bounds[1:])
+            }
+            return trailer_pos, sections
+        raise ValueError(f"{self.path}: {TRAILER_MAGIC.decode()} trailer not found")
+
+    def section(self, name):
+        # Zero-copy view of one section
+        start, end = self.sections[name]
+        return self._view[start:end]
+
+    def footer(self):
+        return self._view[self.trailer_pos:]
+
+    def close(self):
+        self._view.release()
+        self._mm.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def write_view(view, output_path):
+    # Stream a (possibly huge) view to disk without materializing a copy
+    with open(output_path, 'wb') as out:
+        for offset in range(0, len(view), COPY_CHUNK_SIZE):
+            with view[offset:offset + COPY_CHUNK_SIZE] as chunk:
+                out.write(chunk)
+
+def extract_sections(binary_file, output_dir='.'):
+    os.makedirs(output_dir, exist_ok=True)
+    written = {}
+    with StandaloneBinary(binary_file) as binary:
+        print(f"Trailer position: {binary.trailer_pos}")
+        for name, (start, end) in binary.sections.items():
+            print(f"{name} position: {start}, size: {end - start} bytes")
+            if start == end and name not in ('eszip', 'metadata'):
+                # The npm sections are empty unless npm packages are embedded
+                continue
+            output_path = os.path.join(output_dir, SECTION_FILES[name])
+            with binary.section(name) as view:
+                write_view(view, output_path)
+            written[name] = output_path
+            print(f"{name} extracted to '{output_path}'.")
+
+        # Keep the raw trailer as well, as the original extraction did
+        output_path = os.path.join(output_dir, FOOTER_FILE)
+        with binary.footer() as view:
+            write_view(view, output_path)
+        written['footer'] = output_path
+        print(f"Binary footer extracted to '{output_path}'.")
+    return written
+
+def iter_modules(binary_file, kinds=None):
+    # Yield (specifier, kind, source bytes) for every module of the embedded
+    # eszip, read straight from the binary without writing the section out.
+    # Sources are copied out of the mapping, so the binary is closed as soon
+    # as the iterator is exhausted and the caller may keep them.
+    with StandaloneBinary(binary_file) as binary, binary.section('eszip') as view, EszipArchive(view) as archive:
+        for module, source in archive.iter_sources(kinds):
+            with source:
+                data = bytes(source)
+            yield module.specifier, module.kind, data
+
+# Batch mode stores sections and eszip modules in a content-addressed store,
+# so payload shared between builds (vendored npm/std modules, identical
+# metadata) is written once:
+#
+#   <store>/objects/<sha256[:2]>/<sha256[2:]>
+#   <store>/manifests/<binary name>.json
+def store_object(store_dir, view):
+    # Add a blob to the store, returning (digest, newly stored)
+    digest = hashlib.sha256(view).hexdigest()
+    object_dir = os.path.join(store_dir, 'objects', digest[:2])
+    object_path = os.path.join(object_dir, digest[2:])
+    if os.path.exists(object_path):
+        return digest, False
+
+    os.makedirs(object_dir, exist_ok=True)
+    # Write to a temporary name first so concurrent workers never expose a
+    # partial object
+    fd, tmp_path = tempfile.mkstemp(dir=object_dir, suffix='.tmp')
+    os.close(fd)
+    write_view(view, tmp_path)
+    os.replace(tmp_path, object_path)
+    return digest, True
+
+def extract_to_store(binary_file, store_dir):
+    manifest = {'binary': os.path.abspath(binary_file), 'sections': {}, 'modules': {}}
+    stored = reused = 0
+
+    with StandaloneBinary(binary_file) as binary:
+        manifest['trailer_pos'] = binary.trailer_pos
+        for name, (start, end) in binary.sections.items():
+            with binary.section(name) as view:
+                digest, new = store_object(store_dir, view)
+            stored, reused = stored + new, reused + (not new)
+            manifest['sections'][name] = {'offset': start, 'size': end - start, 'sha256': digest}
+
+        with binary.section('eszip') as view:
+            try:
+                archive = EszipArchive(view)
+            except (ValueError, struct.error) as e:
+                manifest['eszip_error'] = str(e)
+            else:
+                with archive:
+                    manifest['eszip_version'] = archive.version
+                    for module in archive.modules.values():
+                        if module.target is not None:
+                            manifest['modules'][module.specifier] = {'kind': module.kind, 'target': module.target}
+                            continue
+                        with archive.source_view(module.specifier) as source:
+                            digest, new = store_object(store_dir, source)
+                        stored, reused = stored + new, reused + (not new)
+                        manifest['modules'][module.specifier] = {'kind': module.kind, 'size': module.length, 'sha256': digest}
+
+    manifest_dir = os.path.join(store_dir, 'manifests')
+    os.makedirs(manifest_dir, exist_ok=True)
+    manifest_path = os.path.join(manifest_dir, os.path.basename(binary_file) + '.json')
+    with open(manifest_path, 'w') as f:
+        json.dump(manifest, f, indent=4)
+    return manifest_path, stored, reused
+
+def extract_batch(input_dir, store_dir, workers=None):
+    binaries = sorted(
+        os.path.join(input_dir, name) for name in os.listdir(input_dir)
+        if os.path.isfile(os.path.join(input_dir, name))
+    )
+    total_stored = total_reused = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(extract_to_store, binary, store_dir): binary for binary in binaries}
+        for future in as_completed(futures):
+            binary = futures[future]
+            try:
+                manifest_path, stored, reused = future.result()
+            except (OSError, ValueError) as e:
+                # Not every file in the directory is a Deno standalone binary
+                print(f"Skipped '{binary}': {e}")
+                continue
+            total_stored += stored
+            total_reused += reused
+            print(f"Extracted '{binary}' -> '{manifest_path}' ({stored} new objects, {reused} already stored).")
+    print(f"Done: {total_stored} objects stored, {total_reused} deduplicated.")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Extract the embedded sections of a Deno standalone binary.")
+    parser.add_argument("binary_file", nargs='?', default='microservice', help="Deno standalone binary (default: microservice).")
+    parser.add_argument("--output-dir", default='.', help="Directory to write the sections to (default: current directory).")
+    parser.add_argument("--batch", metavar="DIR", help="Extract every binary in DIR into the content-addressed --store instead.")
+    parser.add_argument("--store", default='eszip_store', help="Content-addressed store for --batch (default: eszip_store).")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes for --batch (default: CPU count).")
+    args = parser.parse_args()
+
+    try:
+        if args.batch:
+            extract_batch(args.batch, args.store, args.workers)
+        else:
+            extract_sections(args.binary_file, args.output_dir)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
@@ -1,61 +1,186 @@
+import argparse
+import hashlib
 import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait
 
-def create_files_from_log(log_file):
-    with open(log_file, 'r') as f:
-        content = f.read()
-
-    # Split the content into entries separated by '==========='
-    entries = content.strip().split('===========\n')
-    for entry in entries:
-        entry = entry.strip()
-        if not entry:
-            continue  # Skip empty entries
-
-        lines = entry.split('\n')
-        if len(lines) < 4:
-            print('Error: Incomplete entry detected.')
-            continue
-
-        # Parse Specifier
-        specifier_line = lines[0]
-        if not specifier_line.startswith('Specifier: '):
-            print('Error: Specifier not found in entry.')
-            continue
-        specifier = specifier_line[len('Specifier: '):].strip()
-
-        # Parse Kind
-        kind_line = lines[1]
-        if not kind_line.startswith('Kind: '):
-            print('Error: Kind not found in entry.')
-            continue
-        kind = kind_line[len('Kind: '):].strip()
-
-        # Find content between '---' separators
-        try:
-            first_sep_idx = lines.index('---')
-            second_sep_idx = lines.index('---', first_sep_idx + 1)
-            content_lines = lines[first_sep_idx + 1:second_sep_idx]
-            content_text = '\n'.join(content_lines)
-        except ValueError:
-            print('Error: Content separators not found in entry.')
-            continue
-
-        # Process the specifier to create the folder path
-        if specifier.startswith('http://') or specifier.startswith('https://'):
-            specifier = specifier.split('://', 1)[1]
-        path_parts = specifier.strip('/').split('/')
-        file_path = os.path.join(*path_parts)
-
-        # Ensure the directory exists
-        dir_path = os.path.dirname(file_path)
-        if dir_path and not os.path.exists(dir_path):
-            os.makedirs(dir_path)
-
-        # Write the content to the file
-        with open(file_path, 'w', encoding='utf-8') as f_out:
-            f_out.write(content_text)
-
-        print(f'Created file: {file_path}')
-
-# Replace 'log.txt' with the path to your log file
-create_files_from_log('eszip_archive.txt')
+from eszip_reader import EszipFile, MAGICS
+
+ENTRY_SEPARATOR = '==========='
+CONTENT_SEPARATOR = '---'
+WRITE_WORKERS = 8
+
+def specifier_to_path(specifier, output_dir='.'):
+    # Process the specifier to create the folder path
+    if '://' in specifier:
+        specifier = specifier.split('://', 1)[1]
+    path_parts = [part for part in specifier.strip('/').split('/') if part not in ('', '.', '..')]
+    return os.path.join(output_dir, *path_parts)
+
+def file_matches(file_path, data):
+    # True if the file on disk already holds exactly this content
+    try:
+        if os.path.getsize(file_path) != len(data):
+            return False
+        h = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                h.update(chunk)
+    except OSError:
+        return False
+    return h.digest() == hashlib.sha256(data).digest()
+
+def write_module_file(file_path, content):
+    # Write one module unless the file already has the same content.
+    # Returns True if the file was written.
+    data = content.encode('utf-8') if isinstance(content, str) else content
+    if file_matches(file_path, data):
+        return False
+
+    # Ensure the directory exists
+    dir_path = os.path.dirname(file_path)
+    if dir_path:
+        os.makedirs(dir_path, exist_ok=True)
+
+    # Write the content to the file
+    with open(file_path, 'wb') as f_out:
+        f_out.write(data)
+    return True
+
+def write_module_files(files, workers=WRITE_WORKERS):
+    # Write (file_path, content) pairs on a thread pool, keeping only a small
+    # window of modules in flight. Returns (written, unchanged) counts.
+    # Different specifiers can map to the same path (http:// and https://),
+    # so a path is never written by two threads at once and the last entry
+    # still wins.
+    written = unchanged = 0
+    pending = deque()
+    in_flight = {}
+
+    def finish():
+        nonlocal written, unchanged
+        file_path, content, future = pending.popleft()
+        if in_flight.get(file_path) is future:
+            del in_flight[file_path]
+        if future.result():
+            written += 1
+            print(f'Created file: {file_path}')
+        else:
+            unchanged += 1
+        if isinstance(content, memoryview):
+            content.release()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        for file_path, content in files:
+            if file_path in in_flight:
+                wait([in_flight[file_path]])
+            future = executor.submit(write_module_file, file_path, content)
+            in_flight[file_path] = future
+            pending.append((file_path, content, future))
+            if len(pending) >= workers * 4:
+                finish()
+        while pending:
+            finish()
+    return written, unchanged
+
+def parse_log_entry(lines):
+    # Parse the lines of one entry into (specifier, kind, content), or None
+    while lines and not lines[0].strip():
+        lines.pop(0)
+    while lines and not lines[-1].strip():
+        lines.pop()
+    if not lines:
+        return None  # Skip empty entries
+    lines[0] = lines[0].lstrip()
+
+    if len(lines) < 4:
+        print('Error: Incomplete entry detected.')
+        return None
+
+    # Parse Specifier
+    specifier_line = lines[0]
+    if not specifier_line.startswith('Specifier: '):
+        print('Error: Specifier not found in entry.')
+        return None
+    specifier = specifier_line[len('Specifier: '):].strip()
+
+    # Parse Kind
+    kind_line = lines[1]
+    if not kind_line.startswith('Kind: '):
+        print('Error: Kind not found in entry.')
+        return None
+    kind = kind_line[len('Kind: '):].strip()
+
+    # The source runs from the first '---' to the last one, which precedes the
+    # source map, so sources containing '---' lines stay intact
+    try:
+        first_sep_idx = lines.index(CONTENT_SEPARATOR, 2)
+    except ValueError:
+        first_sep_idx = None
+    last_sep_idx = len(lines) - 1
+    while last_sep_idx > 0 and lines[last_sep_idx] != CONTENT_SEPARATOR:
+        last_sep_idx -= 1
+    if first_sep_idx is None or last_sep_idx <= first_sep_idx:
+        print('Error: Content separators not found in entry.')
+        return None
+
+    return specifier, kind, '\n'.join(lines[first_sep_idx + 1:last_sep_idx])
+
+def iter_log_entries(lines):
+    # Stream (specifier, kind, content) out of the text dump, holding only the
+    # current entry in memory
+    entry = []
+    for line in lines:
+        line = line.rstrip('\n')
+        if line.startswith(ENTRY_SEPARATOR):
+            parsed = parse_log_entry(entry)
+            if parsed:
+                yield parsed
+            entry = []
+        else:
+            entry.append(line)
+    parsed = parse_log_entry(entry)
+    if parsed:
+        yield parsed
+
+def write_modules(modules, output_dir='.', workers=WRITE_WORKERS):
+    # Recreate the source tree from any iterable of (specifier, kind, content),
+    # e.g. iter_log_entries() over a text dump or extractor.iter_modules()
+    # over a standalone binary. Returns (written, unchanged) counts.
+    files = (
+        (specifier_to_path(specifier, output_dir), content)
+        for specifier, kind, content in modules
+    )
+    return write_module_files(files, workers)
+
+def create_files_from_log(log_file, output_dir='.', workers=WRITE_WORKERS):
+    with open(log_file, 'r', encoding='utf-8') as f:
+        written, unchanged = write_modules(iter_log_entries(f), output_dir, workers)
+    print(f'{written} files written, {unchanged} unchanged.')
+
+def create_files_from_eszip(eszip_file, output_dir='.', workers=WRITE_WORKERS):
+    # Write the module sources straight from the archive index, reading each
+    # source only when it is written
+    with EszipFile(eszip_file) as archive:
+        modules = (
+            (module.specifier, module.kind, source)
+            for module, source in archive.iter_sources()
+        )
+        written, unchanged = write_modules(modules, output_dir, workers)
+    print(f'{written} files written, {unchanged} unchanged.')
+
+def is_eszip(path):
+    with open(path, 'rb') as f:
+        return f.read(8) in MAGICS
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Recreate a source tree from an eszip archive or its text dump.")
+    parser.add_argument("input_file", nargs='?', default='eszip_archive.txt', help="eszip archive (as written by extractor.py) or text dump (default: eszip_archive.txt).")
+    parser.add_argument("--output-dir", default='.', help="Directory to recreate the sources in (default: current directory).")
+    parser.add_argument("--workers", type=int, default=WRITE_WORKERS, help=f"Number of writer threads (default: {WRITE_WORKERS}).")
+    args = parser.parse_args()
+
+    if is_eszip(args.input_file):
+        create_files_from_eszip(args.input_file, args.output_dir, args.workers)
+    else:
+        create_files_from_log(args.input_file, args.output_dir, args.workers)